@@ -1,16 +1,101 @@
-from google import genai
-from google.auth import default
+import os
+import threading
+import time
 
-# Authenticate using Application Default Credentials
-credentials, _ = default()
-client = genai.Client(credentials=credentials)
+from catalog import estimate_tokens
+from gemini_client import GeminiClient
+from tracing import span, start_span
+
+MODEL_NAME = "gemini-2.5-flash"
+
+_gemini = None
+_gemini_lock = threading.Lock()
+
+def _create_client():
+    if os.environ.get("GEMINI_BACKEND") == "fake":
+        # Offline stand-in, e.g. GEMINI_BACKEND=fake GEMINI_FAKE_DELAY=0.5
+        from fake_gemini import FakeGeminiClient
+        return FakeGeminiClient(
+            delay=float(os.environ.get("GEMINI_FAKE_DELAY", "0")),
+            token_delay=float(os.environ.get("GEMINI_FAKE_TOKEN_DELAY", "0")),
+        )
+    from google import genai
+    from google.auth import default
+
+    # Authenticate using Application Default Credentials
+    credentials, _ = default()
+    return genai.Client(credentials=credentials)
+
+def get_gemini() -> GeminiClient:
+    """
+    Shared by every caller: deadlines, retries with backoff, rate limit,
+    single-flight. The SDK import and ADC lookup happen on first use.
+    """
+    global _gemini
+    if _gemini is None:
+        with _gemini_lock:
+            if _gemini is None:
+                _gemini = GeminiClient(
+                    _create_client(),
+                    MODEL_NAME,
+                    deadline=float(os.environ.get("GEMINI_DEADLINE", "60")),
+                    rate=float(os.environ.get("GEMINI_RATE", "5")),
+                    burst=int(os.environ.get("GEMINI_BURST", "10")),
+                )
+    return _gemini
+
+def gemini_stats() -> dict:
+    """
+    Retry/throttle counters of the shared client; empty until it is created.
+    """
+    return _gemini.stats() if _gemini is not None else {}
 
 def ask_gemini(prompt: str):
     """
     Sends a prompt to Gemini Flash 2.5 and returns the response.
     """
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt
-    )
-    return response.text
+    with span("gemini.generate", model=MODEL_NAME) as stage:
+        answer = get_gemini().generate(prompt)
+        if stage:
+            stage.set("prompt_tokens", estimate_tokens(prompt))
+            stage.set("response_tokens", estimate_tokens(answer or ""))
+        return answer
+
+def ask_gemini_stream(prompt: str):
+    """
+    Streams the Gemini response, yielding text chunks as they arrive.
+    """
+    stage = start_span("gemini.stream", model=MODEL_NAME)
+    if not stage:
+        return get_gemini().generate_stream(prompt)
+    stage.set("prompt_tokens", estimate_tokens(prompt))
+    return _traced_stream(get_gemini().generate_stream(prompt), stage)
+
+def _traced_stream(chunks, stage):
+    """
+    Passes chunks through, recording time to first chunk and response size.
+    """
+    started, parts, error = time.perf_counter(), [], None
+    try:
+        for chunk in chunks:
+            if not parts:
+                stage.set("first_chunk_ms", round((time.perf_counter() - started) * 1000, 3))
+            parts.append(chunk)
+            yield chunk
+    except Exception as exc:
+        error = exc
+        raise
+    finally:
+        stage.set("response_tokens", estimate_tokens("".join(parts)))
+        stage.end(error)
+
+async def ask_gemini_async(prompt: str):
+    """
+    Async variant of ask_gemini, for running many prompts concurrently.
+    """
+    with span("gemini.generate", model=MODEL_NAME) as stage:
+        answer = await get_gemini().generate_async(prompt)
+        if stage:
+            stage.set("prompt_tokens", estimate_tokens(prompt))
+            stage.set("response_tokens", estimate_tokens(answer or ""))
+        return answer
@@ -0,0 +1,77 @@
+# aliases.py
+import json
+import os
+import time
+
+from atomic import atomic_write
+
+# Logical collection name -> versioned physical collection, so ingestion can
+# build a new version while readers keep using the current one.
+ALIASES_PATH = "./vectordb/aliases.json"
+
+_cache = (None, {})  # (aliases mtime_ns, aliases)
+
+def load_aliases(path: str = ALIASES_PATH) -> dict:
+    """
+    Returns {name: {"current": physical, "history": [older physicals, newest last]}}.
+    """
+    global _cache
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if mtime != _cache[0]:
+        with open(path, encoding="utf-8") as f:
+            _cache = (mtime, json.load(f))
+    return _cache[1]
+
+def save_aliases(aliases: dict, path: str = ALIASES_PATH):
+    """
+    Writes the alias table atomically (temp file + rename), so a reader
+    sees either the old target or the new one.
+    """
+    with atomic_write(path, encoding="utf-8") as f:
+        json.dump(aliases, f, indent=2)
+
+def resolve_alias(name: str) -> str:
+    """
+    Physical collection the name currently points to; a name without an
+    alias (e.g. a collection from before versioning) resolves to itself.
+    """
+    entry = load_aliases().get(name)
+    return entry["current"] if entry else name
+
+def versioned_name(name: str) -> str:
+    """
+    A new physical name, e.g. cloud_errors_v20261018T153012123.
+    """
+    now = time.time()
+    return f"{name}_v{time.strftime('%Y%m%dT%H%M%S', time.gmtime(now))}{int(now * 1000) % 1000:03d}"
+
+def swap_alias(name: str, physical: str, remember: bool = True) -> str:
+    """
+    Points name at physical and returns the previous target, which is
+    remembered for rollback unless remember is False.
+    """
+    aliases = dict(load_aliases())
+    previous = resolve_alias(name)
+    history = list(aliases.get(name, {}).get("history", []))
+    if remember and previous != physical:
+        history = [entry for entry in history if entry != previous] + [previous]
+    aliases[name] = {"current": physical, "history": history}
+    save_aliases(aliases)
+    return previous
+
+def rollback_alias(name: str) -> str:
+    """
+    Points name back at the most recent previous version and returns it.
+    The version rolled back from is dropped from the history.
+    """
+    aliases = dict(load_aliases())
+    entry = aliases.get(name)
+    if not entry or not entry["history"]:
+        raise ValueError(f"No previous version of {name} to roll back to")
+    target = entry["history"][-1]
+    aliases[name] = {"current": target, "history": entry["history"][:-1]}
+    save_aliases(aliases)
+    return target
@@ -0,0 +1,30 @@
+# atomic.py
+import os
+import tempfile
+from contextlib import contextmanager
+
+# mkstemp creates files 0600; give replacements the permissions open() would
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w", encoding: str = None):
+    """
+    Yields a file that replaces path only when the block succeeds. The
+    temp file is unique and sits next to path, so concurrent writers never
+    share one and readers see either the old file or the new one.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,30 @@
+# benchmarks/hash_embedder.py
+import hashlib
+import re
+
+import numpy as np
+
+TOKEN = re.compile(r"\w+")
+
+class HashingEmbedder:
+    """
+    Deterministic, offline stand-in for SentenceTransformer: hashed bag of
+    words, L2-normalized, 384 dimensions like all-MiniLM-L6-v2. Only the
+    encode() surface used by this repo is implemented.
+    """
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def _encode_one(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in TOKEN.findall(text.lower()):
+            vector[int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little") % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        if isinstance(sentences, str):
+            return self._encode_one(sentences)
+        if not sentences:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self._encode_one(text) for text in sentences])
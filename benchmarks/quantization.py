@@ -0,0 +1,145 @@
+# benchmarks/quantization.py
+"""
+fp32 vs int8 embedding report on the playbook corpus.
+
+    python benchmarks/quantization.py
+    python benchmarks/quantization.py --threads 4 --json quantization.json
+
+For every backend in embeddings.BACKENDS: model load time, document encode
+throughput (playbook chunks plus catalog entries), single-query latency
+(catalog error signatures) and, against the fp32 baseline, top-k overlap
+of the retrieved documents and mean cosine similarity of the vectors.
+"int8 mixed" retrieves int8 queries against the fp32 index, i.e. switching
+backends without re-ingesting. Needs the model in the local cache; all
+numbers come from this machine, so run it on the host you are sizing.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+PLAYBOOK = os.path.join(REPO_ROOT, "CloudBuildTroubleshootingPlaybook.pdf")
+
+def load_corpus():
+    """
+    Returns (documents, queries): playbook chunks plus rendered catalog
+    entries, and the catalog's error signatures.
+    """
+    import catalog
+    from ingest import iter_chunks, iter_pages
+
+    documents = [chunk for chunk, _ in iter_chunks(iter_pages(PLAYBOOK))]
+    entries = catalog.parse_catalog(catalog.DOCUMENT)
+    documents += [entry.render() for entry in entries]
+    return documents, catalog.error_signatures()
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+def top_k(document_vectors, query_vectors, k):
+    scores = normalize(query_vectors) @ normalize(document_vectors).T
+    return [set(np.argsort(-row)[:k]) for row in scores]
+
+def overlap(baseline, candidate, k):
+    return float(np.mean([len(a & b) / k for a, b in zip(baseline, candidate)]))
+
+def measure(backend, model_name, threads, documents, queries, repeats, batch_size):
+    from embeddings import load_embedder
+
+    started = time.perf_counter()
+    model = load_embedder(model_name, backend=backend, threads=threads)
+    load_s = time.perf_counter() - started
+
+    model.encode(queries[:4])  # warm up kernels outside the timings
+    started = time.perf_counter()
+    for _ in range(repeats):
+        document_vectors = model.encode(documents, batch_size=batch_size)
+    encode_s = (time.perf_counter() - started) / repeats
+
+    latencies, query_vectors = [], []
+    for query in queries:
+        started = time.perf_counter()
+        query_vectors.append(model.encode(query))
+        latencies.append(time.perf_counter() - started)
+
+    return {
+        "load_s": load_s,
+        "docs_per_sec": len(documents) / encode_s,
+        "query_p50_ms": percentile(latencies, 50) * 1000,
+        "query_p95_ms": percentile(latencies, 95) * 1000,
+    }, np.asarray(document_vectors), np.asarray(query_vectors)
+
+def run(args):
+    from embeddings import BACKENDS
+    from resources import EMBEDDING_MODEL
+
+    documents, queries = load_corpus()
+    report = {
+        "meta": {
+            "model": args.model or EMBEDDING_MODEL,
+            "documents": len(documents),
+            "queries": len(queries),
+            "top_k": args.top_k,
+            "threads": args.threads,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "backends": {},
+    }
+    vectors = {}
+    for backend in BACKENDS:
+        stats, doc_vectors, query_vectors = measure(
+            backend, report["meta"]["model"], args.threads, documents, queries, args.repeats, args.batch_size
+        )
+        report["backends"][backend] = stats
+        vectors[backend] = (doc_vectors, query_vectors)
+
+    base_docs, base_queries = vectors["fp32"]
+    baseline = top_k(base_docs, base_queries, args.top_k)
+    for backend, (doc_vectors, query_vectors) in vectors.items():
+        stats = report["backends"][backend]
+        stats["top_k_overlap"] = overlap(baseline, top_k(doc_vectors, query_vectors, args.top_k), args.top_k)
+        stats["mean_cosine_vs_fp32"] = float(np.mean(np.sum(normalize(doc_vectors) * normalize(base_docs), axis=1)))
+        if backend != "fp32":
+            stats["top_k_overlap_mixed"] = overlap(baseline, top_k(base_docs, query_vectors, args.top_k), args.top_k)
+    return report
+
+def print_report(report):
+    meta = report["meta"]
+    print(f"📊 {meta['model']}: {meta['documents']} documents, {meta['queries']} queries, "
+          f"top-{meta['top_k']}, threads={meta['threads'] or 'default'}")
+    columns = ["load_s", "docs_per_sec", "query_p50_ms", "query_p95_ms", "top_k_overlap",
+               "top_k_overlap_mixed", "mean_cosine_vs_fp32"]
+    print(f"{'backend':10}" + "".join(f"{name:>22}" for name in columns))
+    for backend, stats in report["backends"].items():
+        cells = [f"{stats[name]:>22.3f}" if name in stats else f"{'-':>22}" for name in columns]
+        print(f"{backend:10}" + "".join(cells))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare fp32 and int8 embedding backends.")
+    parser.add_argument("--model", help="SentenceTransformer name or path (default: resources.EMBEDDING_MODEL)")
+    parser.add_argument("--threads", type=int, default=0, help="torch threads (0: torch default)")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=5, help="timed passes over the documents")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--json", metavar="FILE", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,111 @@
+# benchmarks/startup.py
+"""
+Cold-start benchmark: import time of the public entry points and
+import-to-first-prompt time of main.py, each in a fresh interpreter.
+
+    python benchmarks/startup.py                  # current tree
+    python benchmarks/startup.py --before HEAD~1  # also a git ref, for before/after
+
+The --before tree is exported with `git archive` and shares this tree's
+./vectordb, ./data and ./.cache, so both sides see the same corpus. Runs
+need the same environment as the CLI (model cache, ADC credentials or
+GEMINI_BACKEND=fake).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED_STATE = ("vectordb", "data", ".cache")
+PROMPT_MARKER = b"Enter Cloud Build error"
+
+IMPORTS = {
+    "import rag_agent.solve_error": "from rag_agent import solve_error",
+    "import pdf_search.search_pdf": "from pdf_search import search_pdf",
+    "import ingest.ingest_pdf": "from ingest import ingest_pdf",
+}
+
+def time_import(tree, statement):
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=tree, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return float(result.stdout.strip().splitlines()[-1])
+
+def time_first_prompt(tree, timeout=300):
+    """
+    Seconds from spawning `python main.py` until its input() prompt is printed.
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-u", "main.py"], cwd=tree,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    seen = b""
+    try:
+        while PROMPT_MARKER not in seen:
+            byte = process.stdout.read(1)
+            if not byte:
+                raise RuntimeError("main.py exited before showing a prompt")
+            seen += byte
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError("timed out waiting for the prompt")
+        return time.perf_counter() - started
+    finally:
+        process.kill()
+        process.wait()
+
+def measure(tree, runs):
+    results = {}
+    cases = {name: (lambda s=statement: time_import(tree, s)) for name, statement in IMPORTS.items()}
+    cases["main.py first prompt"] = lambda: time_first_prompt(tree)
+    for name, case in cases.items():
+        try:
+            samples = [case() for _ in range(runs)]
+            results[name] = {"median_s": statistics.median(samples), "min_s": min(samples), "runs": runs}
+        except RuntimeError as exc:
+            results[name] = {"error": str(exc)}
+    return results
+
+def export_ref(ref, destination):
+    archive = subprocess.run(["git", "archive", ref], cwd=REPO_ROOT, capture_output=True, check=True)
+    subprocess.run(["tar", "-x", "-C", destination], input=archive.stdout, check=True)
+    for name in SHARED_STATE:
+        source = os.path.join(REPO_ROOT, name)
+        if os.path.exists(source):
+            os.symlink(source, os.path.join(destination, name))
+
+def print_table(report):
+    trees = list(report)
+    names = list(report[trees[0]])
+    print(f"{'':32}" + "".join(f"{tree:>16}" for tree in trees))
+    for name in names:
+        cells = []
+        for tree in trees:
+            entry = report[tree][name]
+            cells.append(f"{entry['median_s']:>15.3f}s" if "median_s" in entry else f"{'error':>16}")
+        print(f"{name:32}" + "".join(cells))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure import and first-prompt latency.")
+    parser.add_argument("--before", metavar="REF", help="git ref to compare against")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", metavar="FILE", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    report = {}
+    if args.before:
+        with tempfile.TemporaryDirectory() as before_tree:
+            export_ref(args.before, before_tree)
+            report[args.before] = measure(before_tree, args.runs)
+    report["working tree"] = measure(REPO_ROOT, args.runs)
+
+    print_table(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
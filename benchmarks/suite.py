@@ -0,0 +1,233 @@
+# benchmarks/suite.py
+"""
+End-to-end benchmark suite; runs fully offline.
+
+    python benchmarks/suite.py --save baseline.json
+    python benchmarks/suite.py --compare baseline.json   # exit 1 on regression
+
+Covers ingestion throughput (ingest_pdf / ingest_directory, chunks/sec),
+search_pdf latency, retrieve_context latency at several corpus sizes and
+solve_error latency against fake_gemini with a configurable model delay.
+Everything runs in a scratch directory, so ./vectordb and ./.cache of the
+working tree are never touched. By default the embedder is the
+deterministic HashingEmbedder; --embedder model uses the real
+all-MiniLM-L6-v2 (must already be in the local model cache).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+PLAYBOOK = os.path.join(REPO_ROOT, "CloudBuildTroubleshootingPlaybook.pdf")
+VOCABULARY = (
+    "build step docker image push pull registry artifact trigger permission denied quota region "
+    "timeout network pool vpc peering service account role iam secret deploy cloud run function "
+    "bucket storage object log failed error retry cache dependency compile test yaml substitution"
+).split()
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile of a list of numbers.
+    """
+    ordered = sorted(samples)
+    rank = max(1, min(len(ordered), round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+def latency_stats(samples):
+    return {
+        "kind": "latency",
+        "n": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "mean_ms": sum(samples) / len(samples) * 1000,
+    }
+
+def timed(call, args_list):
+    samples = []
+    for args in args_list:
+        started = time.perf_counter()
+        call(*args)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def synthetic_text(rng, words=80):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+def synthetic_queries(rng, count):
+    return [f"{synthetic_text(rng, 8)} #{i}" for i in range(count)]
+
+def bench_ingestion(scratch, copies, batch_size):
+    import ingest
+
+    pdf_dir = os.path.join(scratch, "pdfs")
+    os.makedirs(pdf_dir)
+    for i in range(copies):
+        shutil.copy(PLAYBOOK, os.path.join(pdf_dir, f"playbook_{i:03d}.pdf"))
+
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        count_before = ingest.get_ingest_collection().count()
+        started = time.perf_counter()
+        ingest.ingest_pdf(os.path.join(pdf_dir, "playbook_000.pdf"), batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        single = ingest.get_ingest_collection().count() - count_before
+        results["ingest_pdf"] = {"kind": "throughput", "chunks": single, "seconds": elapsed,
+                                 "chunks_per_sec": single / elapsed}
+
+        started = time.perf_counter()
+        ingest.ingest_directory(pdf_dir, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        total = ingest.get_ingest_collection().count() - count_before - single
+        results["ingest_directory"] = {"kind": "throughput", "chunks": total, "seconds": elapsed,
+                                       "chunks_per_sec": total / elapsed}
+
+        results["ingest_directory_unchanged"] = latency_stats(
+            timed(ingest.ingest_directory, [(pdf_dir, batch_size)] * 5)
+        )
+    return results
+
+def bench_search_pdf(rng, queries):
+    import catalog
+    import pdf_search
+
+    pdf_search.PDF_PATH = PLAYBOOK
+    pdf_search.get_index()  # load/cache outside the timed loop
+    signatures = catalog.error_signatures()
+    args = [(rng.choice(signatures + VOCABULARY),) for _ in range(queries)]
+    return {"search_pdf": latency_stats(timed(pdf_search.search_pdf, args))}
+
+def load_corpus(rng, size, batch_size):
+    """
+    Replaces the collection with `size` synthetic chunks and rebuilds BM25.
+    """
+    import ingest
+    from aliases import resolve_alias
+    from categories import chunk_metadata
+    from resources import delete_vector_store
+
+    delete_vector_store(resolve_alias(ingest.COLLECTION_NAME))
+    texts = (synthetic_text(rng) for _ in range(size))
+    items = ((f"synthetic-{i}", text, dict(chunk_metadata(text), source="synthetic", page=1))
+             for i, text in enumerate(texts))
+    ingest.embed_and_store(items, batch_size=batch_size)
+    ingest.refresh_bm25_index()
+
+def bench_retrieval(rng, sizes, queries, batch_size):
+    import rag_agent
+
+    results = {}
+    for size in sizes:
+        load_corpus(rng, size, batch_size)
+        for mode in ("dense", "hybrid"):
+            args = [(query, 3, mode) for query in synthetic_queries(rng, queries)]
+            results[f"retrieve_context[{mode},n={size}]"] = latency_stats(timed(rag_agent.retrieve_context, args))
+    return results
+
+def bench_solve_error(rng, queries):
+    import rag_agent
+
+    args = [(query, False) for query in synthetic_queries(rng, queries)]
+    return {"solve_error": latency_stats(timed(rag_agent.solve_error, args))}
+
+def run(args):
+    os.environ["GEMINI_BACKEND"] = "fake"
+    os.environ["GEMINI_FAKE_DELAY"] = str(args.model_delay)
+    os.environ["GEMINI_RATE"] = "1000000"  # measure the pipeline, not the rate limiter
+    os.environ.setdefault("CATALOG_FAST_PATH", "0")  # synthetic queries should reach the model
+    os.environ["VECTOR_BACKEND"] = args.vector_backend
+
+    import resources
+    if args.embedder == "hash":
+        from hash_embedder import HashingEmbedder
+        resources.set_embedder(HashingEmbedder())
+
+    rng = random.Random(args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        cwd = os.getcwd()
+        os.chdir(scratch)  # ./vectordb, ./.cache and the manifest live here
+        try:
+            results.update(bench_ingestion(scratch, args.pdf_copies, args.batch_size))
+            results.update(bench_search_pdf(rng, args.queries))
+            results.update(bench_retrieval(rng, args.corpus_sizes, args.queries, args.batch_size))
+            results.update(bench_solve_error(rng, max(1, args.queries // 5)))
+        finally:
+            os.chdir(cwd)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "embedder": args.embedder,
+            "vector_backend": args.vector_backend,
+            "model_delay_s": args.model_delay,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+def compare(report, baseline, tolerance, min_delta_ms=1.0):
+    """
+    Prints a side-by-side table and returns the metrics that regressed by
+    more than `tolerance` (latency up, or throughput down). Latency changes
+    under `min_delta_ms` are treated as noise.
+    """
+    regressions = []
+    print(f"{'metric':42}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, current in report["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        key = "chunks_per_sec" if current["kind"] == "throughput" else "p95_ms"
+        old, new = previous[key], current[key]
+        change = (new - old) / old if old else 0.0
+        worse = -change if current["kind"] == "throughput" else change
+        if current["kind"] == "latency" and new - old < min_delta_ms:
+            worse = min(worse, 0.0)
+        flag = "  ⚠️" if worse > tolerance else ""
+        print(f"{name + ' ' + key:42}{old:>14.2f}{new:>14.2f}{change:>+10.1%}{flag}")
+        if worse > tolerance:
+            regressions.append(name)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark suite.")
+    parser.add_argument("--embedder", choices=["hash", "model"], default="hash")
+    parser.add_argument("--vector-backend", choices=["chroma", "numpy"], default="chroma")
+    parser.add_argument("--model-delay", type=float, default=0.05, help="fake Gemini latency in seconds")
+    parser.add_argument("--corpus-sizes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--pdf-copies", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="FILE", help="write results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a saved JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore smaller latency changes")
+    args = parser.parse_args()
+
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ No regressions")
+    elif not args.save:
+        print(output)
@@ -0,0 +1,83 @@
+# bm25.py
+import math
+import pickle
+import re
+from collections import Counter
+
+from atomic import atomic_write
+
+# Keep dotted/dashed identifiers such as iam.serviceAccounts.actAs whole,
+# and also index their parts.
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+(?:[.\-/:][a-z0-9_]+)*")
+SEPARATORS = re.compile(r"[.\-/:]")
+
+def tokenize(text: str) -> list:
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        tokens.append(token)
+        if SEPARATORS.search(token):
+            tokens.extend(part for part in SEPARATORS.split(token) if part)
+    return tokens
+
+def index_path(collection_name: str) -> str:
+    return f"./vectordb/bm25_{collection_name}.pickle"
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of chunks, with an inverted index so a query
+    only touches the postings of its own terms.
+    """
+    def __init__(self, ids, documents, k1=1.5, b=0.75, metadatas=None):
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = [metadata or {} for metadata in metadatas] if metadatas is not None else [{} for _ in self.ids]
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_lengths = []
+        for number, document in enumerate(self.documents):
+            counts = Counter(tokenize(document))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((number, tf))
+        total = len(self.documents)
+        self.avg_length = sum(self.doc_lengths) / total if total else 0.0
+        self.idf = {
+            term: math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def search(self, query: str, top_k: int = 10, accept=None) -> list:
+        """
+        Returns [(id, document, score)] for the best-scoring chunks.
+        `accept(metadata)` optionally restricts which chunks may be returned.
+        """
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for number, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[number] / self.avg_length)
+                scores[number] = scores.get(number, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        if accept is not None:
+            scores = {number: score for number, score in scores.items() if accept(self.metadatas[number])}
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(self.ids[number], self.documents[number], score) for number, score in best]
+
+    def save(self, path: str):
+        with atomic_write(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: str):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+def build_from_collection(collection) -> BM25Index:
+    """
+    Builds the lexical index from every chunk currently in a vector store.
+    """
+    stored = collection.get(include=["documents", "metadatas"])
+    return BM25Index(stored["ids"], stored["documents"], metadatas=stored["metadatas"])
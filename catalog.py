@@ -0,0 +1,287 @@
+# catalog.py
+# Shared GCP Cloud Build error catalog: category headers followed by
+# "- <error signature>: <fix>" lines.
+import os
+import re
+from dataclasses import dataclass
+
+import bm25
+from aho_corasick import AhoCorasick
+
+CATALOG_MODE = os.environ.get("CATALOG_MODE", "retrieve")  # "retrieve" or "full"
+CONTEXT_TOP_K = 5  # catalog entries injected per request
+CONTEXT_TOKEN_BUDGET = 400  # approximate tokens for injected entries
+FAST_PATH = os.environ.get("CATALOG_FAST_PATH", "1") != "0"  # answer known errors without the LLM
+
+INSTRUCTION = (
+    "You are a helpful assistant. Answer ONLY based on the DOCUMENT below. "
+    "If the answer is not in the text, respond: 'I couldn't find that in the document.'"
+)
+
+DOCUMENT = """
+Authentication / IAM:
+- AccessDenied … storage.objects.get: Give user Project Viewer + Cloud Build Editor roles or use a dedicated logs bucket with correct permissions.
+- Missing necessary permission iam.serviceAccounts.actAs: Grant iam.serviceAccounts.actAs permission between accounts.
+- Unauthenticated (long-running Docker push/pull): Use custom token with sufficient lifespan.
+- Cloud Build logs not visible: Grant Storage Object Viewer or Project Viewer role.
+
+Deployment / Authentication / IAM:
+- cloudfunctions.functions.get denied: Add Cloud Functions Developer role to build SA.
+- cloudbuild.builds.create denied: Grant Cloud Build SA role or specific permission to create builds.
+- Cloud Build SA cannot get build: Grant cloudbuild.builds.get permission.
+- Permission error deploying to Cloud Run: Add cloudbuild.builds.get or Viewer/Editor roles.
+
+Configuration / Trigger:
+- Failed to trigger build: Couldn't read commit; verify trigger branch, repo, commit SHA, and trigger config.
+- Request is prohibited by organization's policy: Temporarily allow Pub/Sub, create trigger, then reapply org policy.
+- Secure Source Manager: “Build cannot be created”: Validate triggers.yaml; ensure SSM and Build SA have correct IAM.
+- Cross-project trigger creation failing: Grant tokenAccessor role or recreate trigger with correct IAM.
+- 404 : Requested entity was not found: Double-check source location, triggers, config files, IAM.
+
+Build / Runtime / Dependency:
+- docker build failed: failed to solve: file not found: Check Dockerfile paths and build context.
+- Compilation failed: symbol not found: Update dependency versions; sync build tools.
+- Cannot read property 'xyz' of undefined: Ensure environment variables exist and build script passes them.
+- Container failed to start: PORT env variable not set: Modify code to listen on process.env.PORT.
+- CrashLoopBackOff: Add required secrets, confirm network access, check env vars.
+- ImagePullBackError: Grant Artifact Registry read permission to build SA.
+- Internal Error (status = INTERNAL_ERROR): Retry build; check quota usage; file support ticket if persistent.
+- Error response: i/o timeout (docker pull): Pre-pull image using crane or configure proxy / network.
+
+Test / Assertion:
+- jest: command not found: Install dev dependencies in build or run tests inside build environment.
+- pytest failed: database connection refused: Use additional build step or service to run DB during test stage.
+- JUnit test failed: null pointer: Debug test locally, mock dependencies, ensure env variables.
+
+Upload / Artifact:
+- denied: Permission denied to access repository: Add roles/artifactregistry.writer to Cloud Build SA.
+- Object upload failed: 403 Forbidden: Assign roles/storage.objectAdmin or bucket ACL.
+- Artifact Registry upload denied on function deploy: Grant Artifact Registry write permission to Cloud Build SA.
+- Accessing private GCS fails: Use GCS client library or authorized requests.
+
+Networking / Private Pool:
+- Unable to connect … no route to host: Use non-overlapping IP range for private pool.
+- Failed to connect to <external_domain>: Connection timed out: Assign external IPs to pool or configure NAT for external access.
+- Timeout - last error: dial tcp i/o timeout: Fix VPC peering, firewall, routing; configure private pool internal access.
+- Builds stuck / queued in private pool: Fix VPC peering or recreate private pool.
+
+Quota / Resource:
+- Quota restrictions, cannot run builds in this region: Request quota increase or use supported region.
+- App Engine: Max instances exceeded: Lower max_instances or delete old versions.
+- Region quota exceeded: Check quotas in GCP Console; request increase.
+
+Other / Misc:
+- Placeholder image deployed on Cloud Run: Reconfigure CD trigger; check trigger setup and permissions.
+- Unexpected error for Firebase Function: Fix IAM permissions; check build config; ensure correct registry path.
+- Approving old builds fails: Re-submit a new build instead of approving old one.
+- UI / console missing builds: Try CLI; check IAM; clear browser cache.
+- Build cannot be canceled: Use CLI cancel; contact support if persists.
+- Flaky build / inconsistent errors: Retry builds; monitor memory/CPU; consider different machine type.
+- App Engine node build fails (tsconfig missing): Include tsconfig.json in build context; avoid ignoring necessary files.
+- App Engine: Duplicate tags not allowed: Remove or correct instance_tag in app.yaml.
+- App Engine: Build succeeds but logs missing: Use Google-managed encryption keys; adjust retention policy.
+"""
+
+@dataclass(frozen=True, slots=True)
+class CatalogEntry:
+    category: str
+    signature: str
+    fix: str
+
+    def render(self) -> str:
+        return f"- {self.signature}: {self.fix}"
+
+def parse_catalog(document: str = DOCUMENT) -> list:
+    """
+    Parses the catalog into CatalogEntry records. Signatures may contain
+    ": " themselves, so the fix is whatever follows the last one.
+    """
+    entries, category = [], ""
+    for line in document.splitlines():
+        line = line.strip()
+        if line.startswith("- ") and ": " in line:
+            signature, _, fix = line[2:].rpartition(": ")
+            entries.append(CatalogEntry(category, signature, fix))
+        elif line.endswith(":"):
+            category = line[:-1]
+    return entries
+
+def error_signatures(document: str = DOCUMENT) -> list:
+    """
+    Returns the "<error signature>" part of every "- <signature>: <fix>" line.
+    """
+    return [entry.signature for entry in parse_catalog(document)]
+
+def format_fix(entry: CatalogEntry) -> str:
+    return f"Known error ({entry.category}): {entry.signature}\n\nFix: {entry.fix}"
+
+# Signatures are matched on lowercased text with punctuation runs folded to
+# one space; "…" and <placeholders> separate fragments that must all occur.
+# Fragments match whole words only (text and fragments are space-padded).
+_NOISE = re.compile(r"[^\w./-]+|(?<!\w)[./-]+|[./-]+(?!\w)")
+_GAPS = re.compile(r"…|<[^>]*>")
+_PARENS = re.compile(r"\(([^)]*)\)")
+# identifiers like INTERNAL_ERROR or CrashLoopBackOff, specific on their own
+_CODE = re.compile(r"\b(?:[A-Za-z0-9]+_[A-Za-z0-9_]+|[A-Z][a-z0-9]+(?:[A-Z][a-z0-9]*)+)\b")
+MIN_FRAGMENT = 4
+MIN_WORDS = 2  # a variant this short (no code-like token) never short-circuits
+
+def normalize_error_text(text: str) -> str:
+    return " ".join(_NOISE.sub(" ", text.lower()).split())
+
+def _fragments(text: str) -> tuple:
+    parts = (normalize_error_text(part) for part in _GAPS.split(text))
+    return tuple(part for part in parts if len(part) >= MIN_FRAGMENT)
+
+def signature_variants(signature: str) -> list:
+    """
+    Fragment sets that identify a signature: the text outside parentheses
+    plus every parenthesized detail, all required; and, for a detail with
+    a code-like identifier (e.g. "status = INTERNAL_ERROR"), the
+    identifier on its own.
+    """
+    variants = [_fragments(_PARENS.sub(" … ", signature)) + _fragments(" … ".join(_PARENS.findall(signature)))]
+    for detail in _PARENS.findall(signature):
+        variants.extend((normalize_error_text(code),) for code in _CODE.findall(detail))
+    return [variant for variant in variants if variant]
+
+def specificity(variant, signature: str) -> tuple:
+    """
+    (words, characters) of a variant; a code-like identifier from the
+    signature counts as MIN_WORDS words.
+    """
+    codes = {normalize_error_text(code) for code in _CODE.findall(signature)}
+    words = sum(max(len(fragment.split()), MIN_WORDS if fragment in codes else 1) for fragment in variant)
+    return words, sum(map(len, variant))
+
+class CatalogMatcher:
+    """
+    Aho-Corasick automaton over every signature fragment. match() scans a
+    pasted error once and returns the most specific entry whose fragments
+    all occur, or None. Variants under MIN_WORDS words are not indexed.
+    """
+    def __init__(self, entries):
+        self.entries = list(entries)
+        fragments = {}
+        self._variants = []  # (entry number, fragment ids, specificity)
+        for number, entry in enumerate(self.entries):
+            for variant in signature_variants(entry.signature):
+                score = specificity(variant, entry.signature)
+                if score[0] < MIN_WORDS:
+                    continue
+                ids = frozenset(fragments.setdefault(f" {fragment} ", len(fragments)) for fragment in variant)
+                self._variants.append((number, ids, score))
+        self._automaton = AhoCorasick(list(fragments))
+
+    def match(self, text: str):
+        found = self._automaton.find(f" {normalize_error_text(text)} ")
+        if not found:
+            return None
+        best, best_score = None, (0, 0)
+        for number, ids, score in self._variants:
+            if score > best_score and ids <= found:
+                best, best_score = self.entries[number], score
+        return best
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def render_entries(entries) -> str:
+    """
+    Renders entries in the catalog's own format, grouped under their category.
+    """
+    lines, category = [], None
+    for entry in entries:
+        if entry.category != category:
+            category = entry.category
+            lines.append(f"\n{category}:")
+        lines.append(entry.render())
+    return "\n".join(lines) + "\n"
+
+def _last_user_text(llm_request) -> str:
+    for content in reversed(llm_request.contents or []):
+        if content.role == "user" and content.parts:
+            return " ".join(part.text for part in content.parts if part.text)
+    return ""
+
+class CatalogRetriever:
+    """
+    Parses a catalog once and picks the entries relevant to a question
+    (BM25 over category, signature and fix), so each request carries a
+    few entries instead of the whole DOCUMENT.
+    """
+    def __init__(self, document: str = DOCUMENT):
+        self.document = document
+        self.entries = parse_catalog(document)
+        self.matcher = CatalogMatcher(self.entries)
+        self.index = bm25.BM25Index(
+            range(len(self.entries)),
+            [f"{entry.category} {entry.signature} {entry.fix}" for entry in self.entries],
+        )
+
+    def relevant(self, query: str, top_k: int = CONTEXT_TOP_K, token_budget: int = CONTEXT_TOKEN_BUDGET) -> list:
+        picked, used = [], 0
+        for number, _, _ in self.index.search(query, top_k):
+            entry = self.entries[number]
+            cost = estimate_tokens(entry.render())
+            if picked and used + cost > token_budget:
+                break
+            picked.append(entry)
+            used += cost
+        # keep catalog order so category headers group cleanly
+        return sorted(picked, key=self.entries.index)
+
+    def context(self, query: str, top_k: int = CONTEXT_TOP_K, token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+        """
+        DOCUMENT text for one request; the full catalog when nothing matches.
+        """
+        entries = self.relevant(query, top_k, token_budget)
+        return render_entries(entries) if entries else self.document
+
+def agent_instruction(document: str = DOCUMENT, mode: str = CATALOG_MODE) -> str:
+    """
+    The agent instruction: the whole DOCUMENT in "full" mode, only the rules
+    in "retrieve" mode (entries are injected per request).
+    """
+    if mode == "full":
+        return f"{INSTRUCTION}\n\nDOCUMENT:\n{document}"
+    return INSTRUCTION
+
+def _llm_response(text: str):
+    from google.adk.models import LlmResponse
+    from google.genai import types
+
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+def agent_callbacks(document: str = DOCUMENT, mode: str = CATALOG_MODE, fast_path: bool = FAST_PATH) -> dict:
+    """
+    Extra Agent(...) keyword arguments: a before_model_callback that answers
+    known errors straight from the catalog (skipping the model) and, in
+    "retrieve" mode, appends the relevant entries as the DOCUMENT.
+    """
+    if mode == "full" and not fast_path:
+        return {}
+    retriever = CatalogRetriever(document)
+
+    def before_model_callback(callback_context, llm_request):
+        query = _last_user_text(llm_request)
+        if fast_path:
+            entry = retriever.matcher.match(query)
+            if entry is not None:
+                return _llm_response(format_fix(entry))
+        if mode != "full":
+            llm_request.append_instructions([f"DOCUMENT:\n{retriever.context(query)}"])
+        return None
+
+    return {"before_model_callback": before_model_callback}
+
+_default_matcher = None
+
+def match_known_error(text: str):
+    """
+    Fast-path lookup against the shared catalog; returns a CatalogEntry or None.
+    """
+    global _default_matcher
+    if _default_matcher is None:
+        _default_matcher = CatalogMatcher(parse_catalog())
+    return _default_matcher.match(text)
@@ -0,0 +1,76 @@
+# categories.py
+"""
+Coarse error categories ("shards") of the playbook and catalog, and a cheap
+keyword classifier used for both chunks at ingest time and queries at
+retrieval time.
+
+A 500-character chunk usually spans several table rows, so a chunk can be
+in more than one shard: its metadata gets "category" (the best-scoring
+shard) plus a boolean "shard_<name>" flag per shard it belongs to, which
+is what retrieval filters on.
+"""
+import re
+
+# shard -> keywords; matched as lowercase substrings at word starts
+SHARDS = {
+    "iam": ["authentication", "iam", "permission", "access", "denied", "accessdenied", "unauthenticated",
+            "unauthorized", "forbidden", "actas", "serviceaccount", "service account", "role", "token", "credential"],
+    "config": ["configuration", "trigger", "commit", "organization's policy", "org policy", "requested entity",
+               "not found", "source manager", "gitlab", "repo", "yaml", "cloudbuild.builds", "tag"],
+    "build": ["build failed", "docker build", "dockerfile", "compil", "symbol", "dependency", "runtime",
+              "startup", "crashloopbackoff", "imagepull", "container", "port", "internal_error",
+              "internal error", "undefined", "tsconfig", "ssh", "flaky"],
+    "test": ["test", "jest", "pytest", "junit", "assertion"],
+    "artifact": ["artifact", "upload", "gcs", "bucket", "storage.object", "push", "registry"],
+    "networking": ["network", "private pool", "vpc", "peering", "firewall", "no route", "timed out",
+                   "timeout", "dial tcp", "nat", "connect", "proxy"],
+    "deploy": ["deploy", "cloud run", "cloud functions", "firebase", "app engine", "lifecycle", "console",
+               "cancel", "approv", "placeholder"],
+    "quota": ["quota", "resource", "exceeded", "max instances", "max_instances", "region", "memory", "machine type"],
+}
+
+_PATTERNS = {
+    shard: re.compile("|".join(r"(?<![a-z0-9_])" + re.escape(keyword) for keyword in keywords))
+    for shard, keywords in SHARDS.items()
+}
+
+def shard_scores(text: str) -> dict:
+    """
+    Keyword hits per shard, for shards with at least one hit.
+    """
+    lowered = text.lower()
+    scores = {}
+    for shard, pattern in _PATTERNS.items():
+        hits = len(pattern.findall(lowered))
+        if hits:
+            scores[shard] = hits
+    return scores
+
+def classify(text: str) -> list:
+    """
+    Shards the text belongs to, best first; empty when nothing matched.
+    """
+    scores = shard_scores(text)
+    return sorted(scores, key=lambda shard: (-scores[shard], shard))
+
+def chunk_metadata(text: str) -> dict:
+    """
+    Category metadata stored with a chunk.
+    """
+    shards = classify(text)
+    metadata = {"category": shards[0] if shards else "other"}
+    metadata.update({f"shard_{shard}": True for shard in shards})
+    return metadata
+
+def shard_filter(shards):
+    """
+    Vector-store where clause matching chunks in any of the shards, or
+    None for no restriction.
+    """
+    clauses = [{f"shard_{shard}": True} for shard in shards]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+def in_shards(metadata: dict, shards) -> bool:
+    return any(metadata.get(f"shard_{shard}") for shard in shards)
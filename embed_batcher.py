@@ -0,0 +1,88 @@
+# embed_batcher.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from tracing import span
+
+class EmbeddingBatcher:
+    """
+    Micro-batches concurrent single-text encodes: requests arriving within
+    `max_wait` seconds of the first one (up to `max_batch` texts) share one
+    encode() call, and each caller gets its own row back. Identical texts in
+    a batch are encoded once.
+
+    `encode` takes a list of texts and returns one vector per text, e.g.
+    lambda texts: embedder.encode(texts, batch_size=len(texts)).
+    """
+    def __init__(self, encode, max_batch=32, max_wait=0.005):
+        self.encode_batch = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+        self._queue = queue.SimpleQueue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                    self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, text: str, timeout=None):
+        """
+        Blocks until the batch containing text has been encoded.
+        """
+        return self.submit(text).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._encode(batch)
+            except Exception as exc:
+                # whatever failed, nobody waits forever and the worker keeps serving
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    def _encode(self, batch):
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        with span("embed.batch", size=len(batch), unique=len(texts)):
+            vectors = self.encode_batch(texts)
+        if len(vectors) != len(texts):
+            raise ValueError(f"encode returned {len(vectors)} vectors for {len(texts)} texts")
+        rows = dict(zip(texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(rows[text])
+        self.batches += 1
+        self.items += len(batch)
+        self.largest = max(self.largest, len(batch))
+
+    def stats(self) -> dict:
+        mean = self.items / self.batches if self.batches else 0.0
+        return {"batches": self.batches, "items": self.items, "mean_batch": round(mean, 2),
+                "largest_batch": self.largest}
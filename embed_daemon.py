@@ -0,0 +1,328 @@
+# embed_daemon.py
+"""
+Long-lived local embedding server on a Unix socket, so the model is loaded
+once per host instead of once per process.
+
+    python embed_daemon.py                       # socket at EMBED_SOCKET
+
+Any process that calls resources.get_embedder() then talks to the daemon
+when the socket answers, and loads the model itself when it does not
+(EMBED_DAEMON=0 always loads in-process).
+
+The daemon is per user: the default socket lives in $XDG_RUNTIME_DIR (or
+has the uid in its name), it is created mode 600, and clients ignore a
+socket owned by anyone else, so another user on a shared host cannot
+serve your vectors.
+
+Wire format (network byte order), one request/response pair at a time
+over a persistent connection:
+
+    request:  uint32 count, then count x (uint32 length, UTF-8 bytes)
+    response: uint8 status 0, uint32 rows, uint32 dim, rows*dim float32
+              uint8 status 1, uint32 length, UTF-8 error message
+
+A request with count 0 is a ping; it returns rows 0 and the model's dim.
+"""
+import argparse
+import errno
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+SOCKET_PATH = os.environ.get("EMBED_SOCKET") or (
+    os.path.join(os.environ["XDG_RUNTIME_DIR"], "cloudbuild-embed.sock") if os.environ.get("XDG_RUNTIME_DIR")
+    else os.path.join(tempfile.gettempdir(), f"cloudbuild-embed-{os.getuid()}.sock")
+)
+MAX_TEXTS = 4096  # per request
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+CONNECT_TIMEOUT = 0.5  # seconds; the client falls back to in-process encoding after this
+READ_TIMEOUT = float(os.environ.get("EMBED_TIMEOUT", "30"))  # seconds per reply before falling back
+PING_TIMEOUT = 2.0
+RETRY_DAEMON_AFTER = 30  # seconds on the in-process model before trying the daemon again
+LISTEN_BACKLOG = 128
+_BUSY = (errno.EAGAIN, errno.ECONNREFUSED)  # full accept queue; worth retrying until CONNECT_TIMEOUT
+
+_U32 = struct.Struct("!I")
+_HEADER = struct.Struct("!BII")
+_FLOAT32 = np.dtype(">f4")
+
+class ProtocolError(Exception):
+    pass
+
+def _read_exact(stream, size):
+    data = stream.read(size) if hasattr(stream, "read") else _recv_exact(stream, size)
+    if len(data) != size:
+        raise ConnectionError("connection closed mid-message")
+    return data
+
+def _recv_exact(sock, size):
+    parts, remaining = [], size
+    while remaining:
+        part = sock.recv(min(remaining, 1 << 20))
+        if not part:
+            break
+        parts.append(part)
+        remaining -= len(part)
+    return b"".join(parts)
+
+def encode_request(texts) -> bytes:
+    parts = [_U32.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts += [_U32.pack(len(data)), data]
+    return b"".join(parts)
+
+def read_request(stream):
+    """
+    Returns the list of texts, or None when the client closed the connection.
+    """
+    head = stream.read(4)
+    if not head:
+        return None
+    if len(head) != 4:
+        raise ConnectionError("connection closed mid-message")
+    (count,) = _U32.unpack(head)
+    if count > MAX_TEXTS:
+        raise ProtocolError(f"at most {MAX_TEXTS} texts per request")
+    texts, total = [], 0
+    for _ in range(count):
+        (length,) = _U32.unpack(_read_exact(stream, 4))
+        total += length
+        if total > MAX_REQUEST_BYTES:
+            raise ProtocolError(f"request larger than {MAX_REQUEST_BYTES} bytes")
+        texts.append(_read_exact(stream, length).decode("utf-8"))
+    return texts
+
+def encode_vectors(vectors, dim) -> bytes:
+    vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, dim)
+    return _HEADER.pack(0, len(vectors), dim) + vectors.astype(_FLOAT32).tobytes()
+
+def encode_error(message) -> bytes:
+    data = message.encode("utf-8")
+    return struct.pack("!BI", 1, len(data)) + data
+
+def read_response(sock):
+    status = _read_exact(sock, 1)[0]
+    if status != 0:
+        (length,) = _U32.unpack(_read_exact(sock, 4))
+        raise ProtocolError(_read_exact(sock, length).decode("utf-8", "replace"))
+    rows, dim = struct.unpack("!II", _read_exact(sock, 8))
+    vectors = np.frombuffer(_read_exact(sock, rows * dim * 4), dtype=_FLOAT32)
+    return vectors.astype(np.float32).reshape(rows, dim), dim
+
+class DaemonEmbedder:
+    """
+    SentenceTransformer-style encode() backed by the daemon. Each thread
+    keeps its own connection. While the daemon is unreachable or does not
+    answer within `timeout` seconds, calls use the model loaded in-process
+    (via `fallback`), and the daemon is tried again RETRY_DAEMON_AFTER
+    seconds later.
+    """
+    def __init__(self, path=SOCKET_PATH, fallback=None, timeout=READ_TIMEOUT):
+        self.path = path
+        self.fallback = fallback
+        self.timeout = timeout
+        self.dim = None
+        self._local = threading.local()
+        self._fallback_model = None
+        self._fallback_lock = threading.Lock()
+        self._retry_at = 0.0  # monotonic time before which calls skip the daemon
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = self._local.sock = _connect(self.path)
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def request(self, texts, timeout=None):
+        """
+        Raises OSError (socket.timeout included) when the daemon is gone or
+        hung; the connection is dropped, since a late reply would be out of
+        step.
+        """
+        sock = self._connection()
+        try:
+            sock.settimeout(timeout or self.timeout)
+            sock.sendall(encode_request(texts))
+            vectors, self.dim = read_response(sock)
+        except (OSError, ConnectionError):
+            self._close()
+            raise
+        return vectors
+
+    def ping(self) -> int:
+        self.request([], timeout=PING_TIMEOUT)
+        return self.dim
+
+    def _local_model(self):
+        if self._fallback_model is None:
+            with self._fallback_lock:
+                if self._fallback_model is None:
+                    if self.fallback is None:
+                        raise ConnectionError(f"embedding daemon at {self.path} is unavailable")
+                    print(f"⚠️ Embedding daemon at {self.path} unavailable; loading the model in-process",
+                          file=sys.stderr)
+                    self._fallback_model = self.fallback()
+        return self._fallback_model
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Same shapes as SentenceTransformer.encode: one vector for a string,
+        a (n, dim) array for a list. Only batch_size is honoured locally.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if time.monotonic() >= self._retry_at:
+            try:
+                vectors = np.concatenate(
+                    [self.request(texts[i:i + MAX_TEXTS]) for i in range(0, len(texts), MAX_TEXTS)]
+                ) if texts else np.zeros((0, self.dim or 0), dtype=np.float32)
+                return vectors[0] if single else vectors
+            except (OSError, ConnectionError):
+                self._retry_at = time.monotonic() + RETRY_DAEMON_AFTER
+        return self._local_model().encode(sentences, batch_size=batch_size, **kwargs)
+
+def _connect(path):
+    """
+    Connects to the daemon, retrying while its accept queue is full (a
+    socket with a timeout gets EAGAIN instead of waiting) until
+    CONNECT_TIMEOUT.
+    """
+    deadline, delay = time.monotonic() + CONNECT_TIMEOUT, 0.005
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(path)
+            return sock
+        except OSError as exc:
+            sock.close()
+            if exc.errno not in _BUSY or time.monotonic() + delay > deadline:
+                raise
+        time.sleep(delay)
+        delay = min(delay * 2, 0.05)
+
+def _owned(path) -> bool:
+    try:
+        return os.stat(path).st_uid == os.getuid()
+    except FileNotFoundError:
+        return False
+
+def connect(path=SOCKET_PATH, fallback=None):
+    """
+    A DaemonEmbedder if a daemon answers a ping on path, else None. A
+    socket owned by another user is never trusted.
+    """
+    if not os.path.exists(path):
+        return None
+    if not _owned(path):
+        print(f"⚠️ Ignoring embedding daemon socket {path}: owned by another user", file=sys.stderr)
+        return None
+    client = DaemonEmbedder(path, fallback)
+    try:
+        client.ping()
+    except (OSError, ConnectionError, ProtocolError):
+        return None
+    return client
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                texts = read_request(self.rfile)
+            except ProtocolError as exc:
+                self.wfile.write(encode_error(str(exc)))
+                return
+            except (ConnectionError, UnicodeDecodeError, OSError):
+                return
+            if texts is None:
+                return
+            try:
+                self.wfile.write(encode_vectors(server.encode(texts), server.dim))
+            except (ConnectionError, OSError):
+                return
+            except Exception as exc:
+                self.wfile.write(encode_error(repr(exc)))
+
+class EmbeddingDaemon(socketserver.ThreadingUnixStreamServer):
+    """
+    One model, many clients. Single-text requests from different clients
+    are micro-batched (see embed_batcher); multi-text requests are encoded
+    as one batch.
+    """
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, path, model, max_batch=32, max_wait=0.005):
+        from embed_batcher import EmbeddingBatcher
+
+        self.model = model
+        self.dim = int(np.asarray(model.encode("dimension probe")).shape[-1])
+        self.batcher = EmbeddingBatcher(
+            lambda texts: model.encode(texts, batch_size=len(texts)), max_batch=max_batch, max_wait=max_wait
+        )
+        super().__init__(path, _Handler)
+
+    def encode(self, texts):
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        if len(texts) == 1:
+            return np.asarray(self.batcher.encode(texts[0]))[None, :]
+        return self.model.encode(texts, batch_size=min(len(texts), 64))
+
+def _claim_socket(path):
+    """
+    Removes a stale socket file; refuses to start if a daemon already answers.
+    """
+    if not os.path.exists(path):
+        return
+    if not _owned(path):
+        raise SystemExit(f"❌ {path} belongs to another user; set EMBED_SOCKET to a path of your own")
+    if connect(path) is not None:
+        raise SystemExit(f"❌ An embedding daemon is already listening on {path}")
+    os.remove(path)
+
+def serve(path=SOCKET_PATH, max_batch=32, max_wait=0.005):
+    from embeddings import load_embedder
+    from resources import EMBEDDING_MODEL
+
+    _claim_socket(path)
+    model = load_embedder(EMBEDDING_MODEL)
+    umask = os.umask(0o177)  # the socket is created mode 600, with no window where others can connect
+    try:
+        daemon = EmbeddingDaemon(path, model, max_batch, max_wait)
+    finally:
+        os.umask(umask)
+    with daemon:
+        print(f"🚀 Embedding daemon ready on {path} (dim {daemon.dim})", file=sys.stderr)
+        try:
+            daemon.serve_forever()
+        finally:
+            os.remove(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve embeddings over a Unix socket.")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))  # unlink the socket on a plain kill too
+    try:
+        serve(args.socket, args.max_batch, args.max_wait_ms / 1000)
+    except KeyboardInterrupt:
+        pass
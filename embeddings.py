@@ -0,0 +1,46 @@
+# embeddings.py
+"""
+Embedding backends for the SentenceTransformer model (resources.EMBEDDING_MODEL).
+
+    EMBEDDING_BACKEND=fp32   # default: SentenceTransformer as-is
+    EMBEDDING_BACKEND=int8   # Linear layers dynamically quantized to int8
+    EMBEDDING_THREADS=4      # torch intra-op threads (default: torch's choice)
+
+Both backends return the same encode() surface and vector size, so the
+rest of the repo does not care which one is active. Vectors from the two
+backends are close but not identical; re-ingest after switching so the
+index and the queries come from the same backend.
+See benchmarks/quantization.py for throughput, latency and top-k overlap.
+"""
+import os
+
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "fp32")  # "fp32" or "int8"
+EMBEDDING_THREADS = int(os.environ.get("EMBEDDING_THREADS", "0"))  # 0 keeps torch's default
+BACKENDS = ("fp32", "int8")
+
+def set_threads(threads: int):
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+
+def quantize_int8(model):
+    """
+    Replaces the model's nn.Linear layers with dynamically quantized int8
+    ones (weights int8, activations quantized per batch). CPU only.
+    """
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+
+    return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+def load_embedder(model_name: str, backend: str = EMBEDDING_BACKEND, threads: int = EMBEDDING_THREADS):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}, expected one of {BACKENDS}")
+    from sentence_transformers import SentenceTransformer
+
+    set_threads(threads)
+    if backend == "int8":
+        model = SentenceTransformer(model_name, device="cpu")
+        model.eval()
+        return quantize_int8(model)
+    return SentenceTransformer(model_name)
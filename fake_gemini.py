@@ -0,0 +1,80 @@
+# fake_gemini.py
+import asyncio
+import hashlib
+import time
+
+class FakeAPIError(Exception):
+    """
+    Mimics google.genai.errors.APIError: carries an HTTP status `code`.
+    """
+    def __init__(self, code, message="fake error"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeModels:
+    """
+    Offline stand-in for genai.Client().models. Replies are deterministic
+    for a given prompt; `delay` simulates time to first token and
+    `token_delay` the gap between streamed chunks. The first `fail_first`
+    calls raise FakeAPIError(`fail_code`) to exercise retry handling.
+    """
+    def __init__(self, delay=0.0, token_delay=0.0, fail_first=0, fail_code=429):
+        self.delay = delay
+        self.token_delay = token_delay
+        self.fail_first = fail_first
+        self.fail_code = fail_code
+        self.calls = 0
+
+    def _maybe_fail(self):
+        self.calls += 1
+        if self.calls <= self.fail_first:
+            raise FakeAPIError(self.fail_code)
+
+    @staticmethod
+    def reply(contents) -> str:
+        digest = hashlib.sha256(str(contents).encode("utf-8")).hexdigest()[:8]
+        return (
+            f"Cause: fake diagnosis {digest}.\n"
+            "Step-by-step fix:\n"
+            "1. Check the Cloud Build service account permissions.\n"
+            "2. Re-run the build.\n"
+            "Example: gcloud builds submit --config cloudbuild.yaml"
+        )
+
+    def generate_content(self, model, contents, config=None):
+        self._maybe_fail()
+        time.sleep(self.delay)
+        return FakeResponse(self.reply(contents))
+
+    def generate_content_stream(self, model, contents, config=None):
+        self._maybe_fail()
+        time.sleep(self.delay)
+        for i, word in enumerate(self.reply(contents).split(" ")):
+            if i:
+                time.sleep(self.token_delay)
+            yield FakeResponse(word if i == 0 else " " + word)
+
+class FakeAsyncModels:
+    """
+    Async counterpart (client.aio.models); shares call counting and replies.
+    """
+    def __init__(self, models):
+        self._models = models
+
+    async def generate_content(self, model, contents, config=None):
+        self._models._maybe_fail()
+        await asyncio.sleep(self._models.delay)
+        return FakeResponse(self._models.reply(contents))
+
+class FakeAio:
+    def __init__(self, models):
+        self.models = FakeAsyncModels(models)
+
+class FakeGeminiClient:
+    def __init__(self, delay=0.0, token_delay=0.0, fail_first=0, fail_code=429):
+        self.models = FakeModels(delay, token_delay, fail_first, fail_code)
+        self.aio = FakeAio(self.models)
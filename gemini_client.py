@@ -0,0 +1,226 @@
+# gemini_client.py
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+# HTTP status codes worth retrying (google.genai.errors.APIError has .code)
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+def _httpx_errors() -> tuple:
+    """
+    (timeout, transport) exception classes of httpx, which google-genai
+    raises for network failures; neither subclasses the built-in ones.
+    """
+    try:
+        import httpx
+    except ImportError:
+        return (), ()
+    return (httpx.TimeoutException,), (httpx.TransportError,)
+
+def is_timeout(exc: BaseException) -> bool:
+    return isinstance(exc, (TimeoutError,) + _httpx_errors()[0])
+
+def is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (TimeoutError, ConnectionError) + _httpx_errors()[1]):
+        return True
+    return getattr(exc, "code", None) in RETRYABLE_CODES
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` requests per second, bursts up to
+    `capacity`. reserve() takes a token and returns how long the caller
+    must wait before using it, so it works for threads and coroutines.
+    """
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+class GeminiClient:
+    """
+    Shared wrapper around a genai.Client (or fake_gemini.FakeGeminiClient)
+    adding per-call deadlines, exponential backoff with full jitter on
+    retryable errors, a token-bucket rate limit and single-flight
+    deduplication of identical in-flight prompts.
+    """
+    def __init__(self, client, model, deadline=60.0, max_retries=4, base_delay=0.5, max_delay=8.0,
+                 rate=5.0, burst=10):
+        self.client = client
+        self.model = model
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bucket = TokenBucket(rate, burst)
+        self.counters = {"calls": 0, "retries": 0, "throttles": 0, "coalesced": 0, "failures": 0, "timeouts": 0}
+        self._counter_lock = threading.Lock()
+        self._inflight = {}  # prompt -> Future (threads)
+        self._inflight_async = {}  # (loop, prompt) -> asyncio.Future
+        self._inflight_lock = threading.Lock()
+
+    def _count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._counter_lock:
+            return dict(self.counters)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _throttle_delay(self) -> float:
+        wait = self.bucket.reserve()
+        if wait > 0:
+            self._count("throttles")
+        return wait
+
+    @staticmethod
+    def _config(remaining: float) -> dict:
+        return {"http_options": {"timeout": max(1, int(remaining * 1000))}}
+
+    def _call_with_retries(self, call, deadline):
+        """
+        Runs call(remaining_seconds) until it succeeds, fails with a
+        non-retryable error, runs out of retries or passes the deadline.
+        """
+        expires = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            time.sleep(min(self._throttle_delay(), max(0.0, expires - time.monotonic())))
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                self._count("timeouts")
+                raise TimeoutError("Gemini call exceeded its deadline")
+            self._count("calls")
+            try:
+                return call(remaining)
+            except Exception as exc:
+                delay = self._backoff(attempt)
+                if not is_retryable(exc) or attempt >= self.max_retries or time.monotonic() + delay >= expires:
+                    self._count("timeouts" if is_timeout(exc) else "failures")
+                    raise
+                self._count("retries")
+                attempt += 1
+                time.sleep(delay)
+
+    def generate(self, prompt: str, deadline=None) -> str:
+        """
+        Returns the response text. Concurrent calls with the same prompt
+        share one request.
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(prompt)
+            leader = future is None
+            if leader:
+                future = self._inflight[prompt] = Future()
+        if not leader:
+            self._count("coalesced")
+            return future.result()
+        try:
+            text = self._call_with_retries(
+                lambda remaining: self.client.models.generate_content(
+                    model=self.model, contents=prompt, config=self._config(remaining)
+                ).text,
+                deadline,
+            )
+            future.set_result(text)
+            return text
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[prompt]
+
+    def generate_stream(self, prompt: str, deadline=None):
+        """
+        Yields response text chunks. Retries only happen before the first
+        chunk arrives; a stream that fails midway is re-raised.
+        """
+        expires = time.monotonic() + (deadline or self.deadline)
+
+        def open_stream(remaining):
+            stream = iter(self.client.models.generate_content_stream(
+                model=self.model, contents=prompt, config=self._config(remaining)
+            ))
+            return stream, next(stream, None)
+
+        stream, first = self._call_with_retries(open_stream, deadline)
+        if first is not None and first.text:
+            yield first.text
+        for chunk in stream:
+            if time.monotonic() > expires:
+                self._count("timeouts")
+                raise TimeoutError("Gemini stream exceeded its deadline")
+            if chunk.text:
+                yield chunk.text
+
+    async def generate_async(self, prompt: str, deadline=None) -> str:
+        """
+        Async generate() with the same retry, rate limit and single-flight
+        behaviour; the deadline is enforced with asyncio.wait_for.
+        """
+        loop = asyncio.get_running_loop()
+        key = (loop, prompt)
+        with self._inflight_lock:
+            future = self._inflight_async.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight_async[key] = loop.create_future()
+        if not leader:
+            self._count("coalesced")
+            return await asyncio.shield(future)
+        try:
+            text = await self._call_with_retries_async(prompt, deadline)
+            future.set_result(text)
+            return text
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight_async[key]
+
+    async def _call_with_retries_async(self, prompt, deadline):
+        expires = time.monotonic() + (deadline or self.deadline)
+        attempt = 0
+        while True:
+            await asyncio.sleep(min(self._throttle_delay(), max(0.0, expires - time.monotonic())))
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                self._count("timeouts")
+                raise TimeoutError("Gemini call exceeded its deadline")
+            self._count("calls")
+            try:
+                response = await asyncio.wait_for(
+                    self.client.aio.models.generate_content(
+                        model=self.model, contents=prompt, config=self._config(remaining)
+                    ),
+                    remaining,
+                )
+                return response.text
+            except Exception as exc:
+                delay = self._backoff(attempt)
+                if not is_retryable(exc) or attempt >= self.max_retries or time.monotonic() + delay >= expires:
+                    self._count("timeouts" if is_timeout(exc) else "failures")
+                    raise
+                self._count("retries")
+                attempt += 1
+                await asyncio.sleep(delay)
@@ -1,26 +1,438 @@
-# ingest_pdf.py
-from sentence_transformers import SentenceTransformer
-import chromadb
-from PyPDF2 import PdfReader
-
-PDF_PATH = "./data/cloudbuild_errors.pdf"
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-client = chromadb.PersistentClient(path="./vectordb")
-collection = client.get_or_create_collection("cloud_errors")
-
-def chunk_text(text, size=500):
-    return [text[i:i+size] for i in range(0, len(text), size)]
-
-def ingest_pdf():
-    reader = PdfReader(PDF_PATH)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n"
-    chunks = chunk_text(text)
-    for i, chunk in enumerate(chunks):
-        embedding = embedder.encode(chunk).tolist()
-        collection.add(ids=[str(i)], documents=[chunk], embeddings=[embedding])
-    print("✅ PDF ingested into vector DB!")
-
-if __name__ == "__main__":
-    ingest_pdf()
+# ingest_pdf.py
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from PyPDF2 import PdfReader
+
+import bm25
+from aliases import load_aliases, resolve_alias, rollback_alias, save_aliases, swap_alias, versioned_name
+from categories import chunk_metadata
+from manifest import chunk_id, file_hash, load_manifest, save_manifest, snapshot_path, source_key
+from resources import delete_vector_store, forget_vector_store, get_embedder, get_vector_store, list_vector_stores
+from tracing import span
+
+PDF_PATH = "./data/cloudbuild_errors.pdf"
+CHUNK_SIZE = 500
+BATCH_SIZE = 64  # chunks per encode() call and per vector store write
+
+COLLECTION_NAME = "cloud_errors"
+METADATA_VERSION = 2  # bump when chunk metadata changes; forces a full re-embed
+VALIDATION_SAMPLES = 5  # stored chunks re-queried before a new version goes live
+KEEP_VERSIONS = 2  # previous versions kept for rollback by gc_versions()
+
+def get_ingest_collection():
+    """
+    The live VectorStore (Chroma or NumPy, see VECTOR_BACKEND) that
+    COLLECTION_NAME currently points to.
+    """
+    return get_vector_store(resolve_alias(COLLECTION_NAME), create=True)
+
+def chunk_text(text, size=CHUNK_SIZE):
+    return [text[i:i+size] for i in range(0, len(text), size)]
+
+def iter_pages(pdf_path):
+    """
+    Yields (page_number, text) one page at a time.
+    """
+    reader = PdfReader(pdf_path)
+    for number, page in enumerate(reader.pages, start=1):
+        with span("ingest.extract", page=number) as stage:
+            text = page.extract_text() or ""
+            stage.set("chars", len(text))
+        yield number, text
+
+def iter_chunks(pages, size=CHUNK_SIZE):
+    """
+    Yields (chunk, page_number) from a stream of pages, producing the same
+    chunks as chunk_text() over the joined document. Only the current page
+    plus one partial chunk is held in memory; a chunk that spans a page
+    break is attributed to the page it starts on.
+    """
+    buffer, start_page = "", None
+    for number, text in pages:
+        with span("ingest.chunk", page=number) as stage:
+            if not buffer:
+                start_page = number
+            buffer += text + "\n"
+            ready, pos = [], 0
+            while len(buffer) - pos >= size:
+                ready.append((buffer[pos:pos + size], start_page))
+                pos += size
+                start_page = number
+            buffer = buffer[pos:]
+            stage.set("chunks", len(ready))
+        yield from ready
+    if buffer:
+        yield buffer, start_page
+
+def batched(items, n):
+    """
+    Groups an iterable into lists of at most n items.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def embed_and_store(items, batch_size=BATCH_SIZE, collection=None):
+    """
+    Encodes (id, chunk, metadata) items in batches and upserts each batch into
+    `collection` (default: the live vector store).
+    One model forward pass and one write per batch instead of per chunk;
+    items may be a generator, so only one batch is held at a time.
+    Returns the number of chunks written.
+    """
+    embedder = get_embedder()
+    collection = collection if collection is not None else get_ingest_collection()
+    written = 0
+    for batch in batched(items, batch_size):
+        batch_ids = [cid for cid, _, _ in batch]
+        batch_docs = [chunk for _, chunk, _ in batch]
+        batch_meta = [metadata for _, _, metadata in batch]
+        with span("ingest.embed", chunks=len(batch)):
+            embeddings = embedder.encode(batch_docs, batch_size=batch_size)
+        with span("ingest.write", chunks=len(batch)):
+            collection.upsert(
+                ids=batch_ids, documents=batch_docs, metadatas=batch_meta, embeddings=embeddings.tolist()
+            )
+        written += len(batch)
+    collection.flush()
+    return written
+
+def refresh_bm25_index(physical=None):
+    """
+    Rebuilds the lexical (BM25) index that rag_agent fuses with dense results,
+    for a physical collection (default: the live one).
+    """
+    physical = physical or resolve_alias(COLLECTION_NAME)
+    bm25.build_from_collection(get_vector_store(physical, create=True)).save(bm25.index_path(physical))
+
+def _document_chunks(pdf_path):
+    """
+    Extracts one PDF into a list of (id, chunk, page). Runs in a worker
+    process for directory ingestion, so it only touches PyPDF2.
+    """
+    source = source_key(pdf_path)
+    return [(chunk_id(source, chunk), chunk, page) for chunk, page in iter_chunks(iter_pages(pdf_path))]
+
+def _iter_document_chunks(pdf_path):
+    """
+    Streaming, in-process counterpart of _document_chunks().
+    """
+    source = source_key(pdf_path)
+    for chunk, page in iter_chunks(iter_pages(pdf_path)):
+        yield chunk_id(source, chunk), chunk, page
+
+def _stale_metadata(manifest):
+    return bool(manifest["sources"]) and manifest.get("metadata_version", 1) != METADATA_VERSION
+
+def load_live_manifest():
+    """
+    The manifest of the version the alias points to. The alias is the source
+    of truth: if MANIFEST_PATH describes another version (e.g. an ingest
+    died between the swap and the manifest write), that version's snapshot
+    is used instead.
+    """
+    manifest = load_manifest()
+    live = resolve_alias(COLLECTION_NAME)
+    if manifest.get("collection", live) != live and os.path.exists(snapshot_path(live)):
+        snapshot = load_manifest(snapshot_path(live))
+        snapshot["generation"] = max(snapshot["generation"], manifest["generation"])
+        return snapshot
+    return manifest
+
+def _manifest_is_live(manifest):
+    """
+    True when the manifest describes the version the alias points to, so
+    unchanged hashes can be trusted without opening the vector store.
+    """
+    return COLLECTION_NAME in load_aliases() and manifest.get("collection") == resolve_alias(COLLECTION_NAME)
+
+def _changed_sources(pdf_paths, manifest, rebuild=False):
+    """
+    Returns [(pdf_path, file_hash)] for files whose hash differs from the manifest.
+    The vector store is only opened (to see whether it was wiped) when the
+    manifest does not describe the live version, so a no-op run costs one
+    hash per file.
+    """
+    # chunks lack current metadata, or the vector DB was wiped; rebuild everything
+    wiped = rebuild or _stale_metadata(manifest) or (
+        not _manifest_is_live(manifest) and get_ingest_collection().count() == 0
+    )
+    changed = []
+    for pdf_path in pdf_paths:
+        digest = file_hash(pdf_path)
+        previous = manifest["sources"].get(source_key(pdf_path))
+        if wiped or not previous or previous["file_hash"] != digest:
+            changed.append((pdf_path, digest))
+    return changed
+
+def _deleted_sources(pdf_dir, pdf_paths, manifest):
+    """
+    Manifest sources under pdf_dir whose file is gone.
+    """
+    root = source_key(pdf_dir)
+    prefix = "" if root == "." else root + os.sep
+    present = {source_key(path) for path in pdf_paths}
+    return sorted(source for source in manifest["sources"] if source.startswith(prefix) and source not in present)
+
+def _copy_chunks(source_store, target_store, ids, batch_size):
+    """
+    Copies stored chunks (text, metadata and embedding) between versions
+    without re-encoding them. Returns how many were found.
+    """
+    copied = 0
+    for start in range(0, len(ids), batch_size):
+        stored = source_store.get(ids=ids[start:start + batch_size],
+                                  include=["documents", "metadatas", "embeddings"])
+        if stored["ids"]:
+            target_store.upsert(ids=stored["ids"], documents=stored["documents"],
+                                metadatas=stored["metadatas"], embeddings=stored["embeddings"])
+            copied += len(stored["ids"])
+    target_store.flush()
+    return copied
+
+def validate_version(store, expected_count, samples=VALIDATION_SAMPLES):
+    """
+    Checks a freshly built version before it goes live: the chunk count
+    must match the manifest, and a few stored chunks queried by their own
+    embedding must come back as the top hit. Raises RuntimeError otherwise.
+    """
+    count = store.count()
+    if count != expected_count:  # an empty version is fine once every source is deleted
+        raise RuntimeError(f"expected {expected_count} chunks, found {count}")
+    ids = store.get(include=[])["ids"]
+    step = max(1, len(ids) // samples)
+    sample = store.get(ids=ids[::step][:samples], include=["documents", "embeddings"])
+    for document, embedding in zip(sample["documents"], sample["embeddings"]):
+        results = store.query(query_embeddings=[list(map(float, embedding))], n_results=1)
+        if not results["documents"][0] or results["documents"][0][0] != document:
+            raise RuntimeError("sample query did not return its own chunk")
+
+def _publish(manifest, physical, previous_empty=False):
+    """
+    Atomically points the alias at a validated version, then records the
+    manifest for it (live copy plus a per-version snapshot for rollback).
+    An empty previous version is not worth rolling back to and is deleted.
+    """
+    manifest["collection"] = physical
+    save_manifest(manifest, snapshot_path(physical))
+    previous = swap_alias(COLLECTION_NAME, physical, remember=not previous_empty)
+    save_manifest(manifest)
+    if previous_empty and previous != physical:
+        delete_vector_store(previous)
+    else:
+        forget_vector_store(previous)
+    return previous
+
+def _sync_documents(documents, manifest, batch_size, rebuild=False, deleted=()):
+    """
+    Builds a new version of the collection next to the live one: chunks of
+    every (pdf_path, file_hash, chunks) document that are new are embedded
+    in one batched stage, every other chunk still in the manifest is copied
+    from the live version, and chunks that disappeared (including every
+    chunk of the `deleted` sources) are simply left behind. The version is validated and the alias swapped only on success,
+    so readers never see a partial index. Returns (embedded, unchanged, removed).
+    """
+    live = get_ingest_collection()
+    empty = live.count() == 0
+    stale = _stale_metadata(manifest)
+    wiped = rebuild or empty or stale
+    physical = versioned_name(COLLECTION_NAME)
+    target = get_vector_store(physical, create=True)
+    seen = {}  # source -> ordered set of chunk ids; texts are not retained
+    digests = {}
+    fresh = set()
+
+    def new_chunks():
+        for pdf_path, digest, chunks in documents:
+            source = source_key(pdf_path)
+            previous = manifest["sources"].get(source)
+            known = set(previous["chunks"]) if previous and not wiped else set()
+            ids = seen.setdefault(source, {})
+            digests[source] = digest
+            for cid, chunk, page in chunks:
+                if cid in ids:
+                    continue
+                ids[cid] = None
+                if cid not in known:
+                    fresh.add(cid)
+                    yield cid, chunk, dict(chunk_metadata(chunk), source=source, page=page)
+
+    try:
+        embedded = embed_and_store(new_chunks(), batch_size=batch_size, collection=target)
+
+        removed = sum(len(manifest["sources"].pop(source)["chunks"]) for source in deleted)
+        for source, ids in seen.items():
+            previous = manifest["sources"].get(source)
+            removed += len(set(previous["chunks"]) - ids.keys()) if previous else 0
+            manifest["sources"][source] = {"file_hash": digests[source], "chunks": list(ids)}
+        if empty:  # sources outside this run are not in the DB any more
+            for source in set(manifest["sources"]) - seen.keys():
+                removed += len(manifest["sources"].pop(source)["chunks"])
+
+        carried = [cid for entry in manifest["sources"].values() for cid in entry["chunks"] if cid not in fresh]
+        with span("ingest.copy", chunks=len(carried)):
+            _copy_chunks(live, target, carried, batch_size)
+        with span("ingest.validate"):
+            validate_version(target, sum(len(entry["chunks"]) for entry in manifest["sources"].values()))
+        with span("ingest.bm25"):
+            refresh_bm25_index(physical)
+    except Exception:
+        delete_vector_store(physical)
+        raise
+
+    manifest["generation"] += 1
+    if not stale or manifest["sources"].keys() <= seen.keys():
+        manifest["metadata_version"] = METADATA_VERSION  # every source has been re-embedded
+    _publish(manifest, physical, previous_empty=empty)
+
+    total = sum(len(ids) for ids in seen.values())
+    return embedded, total - embedded, removed
+
+def _nothing_to_ingest(label, started):
+    physical = resolve_alias(COLLECTION_NAME)
+    if not os.path.exists(bm25.index_path(physical)):
+        refresh_bm25_index(physical)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"✅ {label} unchanged, nothing to ingest ({elapsed_ms:.1f} ms)")
+
+def rollback():
+    """
+    Points the alias back at the previous version and restores its manifest.
+    """
+    current = load_manifest()
+    target = rollback_alias(COLLECTION_NAME)
+    manifest = load_manifest(snapshot_path(target)) if os.path.exists(snapshot_path(target)) else {
+        "generation": 0, "metadata_version": 1, "sources": {}
+    }  # a collection from before versioning has no snapshot; the next ingest re-embeds
+    manifest["generation"] = max(manifest["generation"], current["generation"]) + 1
+    manifest["collection"] = target
+    save_manifest(manifest)
+    print(f"↩️  {COLLECTION_NAME} -> {target}")
+    return target
+
+def gc_versions(keep=KEEP_VERSIONS):
+    """
+    Deletes versions that are neither live nor among the `keep` most recent
+    rollback targets, including leftovers of failed builds, along with
+    their BM25 index and manifest snapshot. Returns the deleted names.
+    """
+    entry = load_aliases().get(COLLECTION_NAME, {"current": resolve_alias(COLLECTION_NAME), "history": []})
+    retained = {entry["current"], *entry["history"][-keep:]} if keep else {entry["current"]}
+    candidates = set(list_vector_stores(COLLECTION_NAME + "_v")) | set(entry["history"])
+    deleted = sorted(candidates - retained)
+    for physical in deleted:
+        delete_vector_store(physical)
+        for path in (bm25.index_path(physical), snapshot_path(physical)):
+            if os.path.exists(path):
+                os.remove(path)
+    if deleted and COLLECTION_NAME in load_aliases():
+        aliases = dict(load_aliases())
+        aliases[COLLECTION_NAME] = dict(entry, history=[h for h in entry["history"] if h in retained])
+        save_aliases(aliases)
+    return deleted
+
+def _report(label, started, embedded, unchanged, removed):
+    elapsed = time.perf_counter() - started
+    rate = embedded / elapsed if elapsed > 0 else 0.0
+    print(
+        f"✅ {label} ingested into vector DB! {embedded} embedded, "
+        f"{unchanged} unchanged, {removed} removed "
+        f"in {elapsed:.2f}s ({rate:.1f} chunks/sec)"
+    )
+
+def ingest_pdf(pdf_path=PDF_PATH, batch_size=BATCH_SIZE, rebuild=False):
+    """
+    Incrementally syncs one PDF into a new version of the collection: only
+    new or changed chunks are embedded, the rest are copied, removed chunks
+    are dropped, and an unchanged file is a no-op. rebuild re-embeds everything.
+    """
+    with span("ingest.pdf", source=source_key(pdf_path)) as stage:
+        started = time.perf_counter()
+        manifest = load_live_manifest()
+        changed = _changed_sources([pdf_path], manifest, rebuild)
+        if not changed:
+            _nothing_to_ingest("PDF", started)
+            return
+
+        # page reader -> chunker -> new-chunk filter -> embed/write batches
+        documents = ((path, digest, _iter_document_chunks(path)) for path, digest in changed)
+        stats = _sync_documents(documents, manifest, batch_size, rebuild)
+        stage.set("embedded", stats[0])
+        _report("PDF", started, *stats)
+
+def ingest_directory(pdf_dir, batch_size=BATCH_SIZE, workers=None, rebuild=False):
+    """
+    Ingests every *.pdf under pdf_dir. Page extraction (CPU-bound and
+    GIL-limited in PyPDF2) runs in a process pool of `workers` processes
+    (default: one per core), with at most 2 x workers documents extracted
+    ahead of the embedder; chunks from all documents then flow through a
+    single embedding/writer stage in this process. PDFs that were ingested
+    from pdf_dir but are gone now are dropped. Extraction spans from
+    the workers reach TRACE_FILE but not this process's metrics registry.
+    """
+    with span("ingest.directory", source=source_key(pdf_dir)) as stage:
+        started = time.perf_counter()
+        pdf_paths = sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(pdf_dir)
+            for name in names
+            if name.lower().endswith(".pdf")
+        )
+        manifest = load_live_manifest()
+        changed = _changed_sources(pdf_paths, manifest, rebuild)
+        deleted = _deleted_sources(pdf_dir, pdf_paths, manifest)
+        if not changed and not deleted:
+            _nothing_to_ingest(f"{len(pdf_paths)} PDFs", started)
+            return
+
+        # spawn: by now this process holds the Chroma client's threads and maybe the model
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+
+            def documents():
+                # at most 2 x workers extracted documents are held at once
+                todo, futures = iter(changed), {}
+                while True:
+                    for path, digest in islice(todo, 2 * workers - len(futures)):
+                        futures[pool.submit(_document_chunks, path)] = (path, digest)
+                    if not futures:
+                        return
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path, digest = futures.pop(future)
+                        yield path, digest, future.result()
+                    del done
+
+            stats = _sync_documents(documents(), manifest, batch_size, rebuild, deleted)
+        stage.set("embedded", stats[0])
+        _report(f"{len(changed)} of {len(pdf_paths)} PDFs", started, *stats)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest a PDF, or a directory of PDFs, into the vector DB.")
+    parser.add_argument("pdf_path", nargs="?", default=PDF_PATH)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="extraction processes for a directory")
+    parser.add_argument("--rebuild", action="store_true", help="re-embed every chunk instead of copying")
+    parser.add_argument("--rollback", action="store_true", help="point the collection back at the previous version")
+    parser.add_argument("--gc", action="store_true", help="delete versions beyond --keep rollback targets")
+    parser.add_argument("--keep", type=int, default=KEEP_VERSIONS)
+    args = parser.parse_args()
+    if args.rollback:
+        rollback()
+    elif args.gc:
+        deleted = gc_versions(args.keep)
+        print(f"🧹 Deleted {len(deleted)} old version(s)" + (f": {', '.join(deleted)}" if deleted else ""))
+    elif os.path.isdir(args.pdf_path):
+        ingest_directory(args.pdf_path, batch_size=args.batch_size, workers=args.workers, rebuild=args.rebuild)
+    else:
+        ingest_pdf(args.pdf_path, batch_size=args.batch_size, rebuild=args.rebuild)
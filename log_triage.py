@@ -0,0 +1,148 @@
+# log_triage.py
+"""
+Streams a Cloud Build log, pulls out the distinct error lines and runs only
+those through the existing lookup path.
+
+    python log_triage.py build.log                   # solve_error per distinct error
+    gcloud builds log <ID> | python log_triage.py - --resolver search --json
+"""
+import argparse
+import asyncio
+import io
+import json
+import re
+import sys
+
+from catalog import format_fix, match_known_error
+
+MAX_LINE_LENGTH = 4000  # longer lines are truncated, never buffered whole
+MAX_DISTINCT = 50  # distinct errors kept per log; the rest are only counted
+
+ERROR_PATTERN = re.compile(
+    r"\b(error|errors|failed|failure|fatal|denied|forbidden|exception|panic|refused|"
+    r"unauthenticated|unauthorized|timed out|timeout|not found|quota|crashloopbackoff|"
+    r"imagepullbackoff|exceeded)\b|\berr!",  # "err!" for npm's "npm ERR!" lines
+    re.IGNORECASE,
+)
+NOT_ERROR_PATTERN = re.compile(r"\b(0|no) (errors?|failures?)\b", re.IGNORECASE)
+
+# Volatile parts stripped before deduplication
+PREFIX_PATTERN = re.compile(r'^(step #\d+(?: - "[^"]*")?:\s*)', re.IGNORECASE)
+TIMESTAMP_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}[t ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:z|[+-]\d{2}:?\d{2})?", re.IGNORECASE)
+HEX_PATTERN = re.compile(r"\b(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|[0-9a-f]{12,})\b", re.IGNORECASE)
+NUMBER_PATTERN = re.compile(r"\d+")
+
+def iter_lines(stream, max_length=MAX_LINE_LENGTH):
+    """
+    Yields lines without their newline; an overlong line is truncated and
+    the remainder is skipped in max_length pieces.
+    """
+    while True:
+        line = stream.readline(max_length)
+        if not line:
+            return
+        if not line.endswith("\n"):
+            rest = line
+            while rest and not rest.endswith("\n"):
+                rest = stream.readline(max_length)
+        yield line.rstrip("\r\n")
+
+def is_error_line(line: str) -> bool:
+    return bool(ERROR_PATTERN.search(line)) and not NOT_ERROR_PATTERN.search(line)
+
+def dedupe_key(line: str) -> str:
+    """
+    Normalizes away step prefixes, timestamps, ids and numbers so repeats
+    of the same error collapse to one key.
+    """
+    key = PREFIX_PATTERN.sub("", line.strip())
+    key = TIMESTAMP_PATTERN.sub("<ts>", key)
+    key = HEX_PATTERN.sub("<id>", key)
+    key = NUMBER_PATTERN.sub("<n>", key)
+    return " ".join(key.lower().split())
+
+def extract_errors(stream, max_distinct=MAX_DISTINCT):
+    """
+    One pass over the log. Returns (stats, errors) where errors maps a
+    dedupe key to {"error", "count", "first_line"} in first-seen order.
+    """
+    errors = {}
+    stats = {"lines": 0, "error_lines": 0, "dropped": 0}
+    for number, line in enumerate(iter_lines(stream), start=1):
+        stats["lines"] = number
+        if not is_error_line(line):
+            continue
+        stats["error_lines"] += 1
+        key = dedupe_key(line)
+        entry = errors.get(key)
+        if entry is not None:
+            entry["count"] += 1
+        elif len(errors) < max_distinct:
+            errors[key] = {"error": PREFIX_PATTERN.sub("", line.strip()), "count": 1, "first_line": number}
+        else:
+            stats["dropped"] += 1
+    return stats, errors
+
+def resolve(errors, resolver="solve"):
+    """
+    Adds an "answer" and its "source" to each distinct error. Known catalog
+    signatures are answered directly; the rest go through search_pdf,
+    retrieve_context or solve_error (batched) depending on `resolver`.
+    """
+    pending = []
+    for entry in errors:
+        known = match_known_error(entry["error"])
+        if known is not None:
+            entry.update(answer=format_fix(known), source="catalog")
+        else:
+            pending.append(entry)
+    if not pending:
+        return errors
+
+    if resolver == "solve":
+        from rag_agent import solve_errors_batch
+        results = asyncio.run(solve_errors_batch([entry["error"] for entry in pending]))
+        for entry, result in zip(pending, results):
+            entry.update(answer=result.get("answer", result.get("error")), source="rag")
+    elif resolver == "context":
+        from rag_agent import retrieve_context
+        for entry in pending:
+            entry.update(answer=retrieve_context(entry["error"]), source="vector")
+    else:
+        from pdf_search import search_pdf
+        for entry in pending:
+            entry.update(answer=search_pdf(entry["error"]), source="pdf")
+    return errors
+
+def triage_log(stream, resolver="solve", max_distinct=MAX_DISTINCT) -> dict:
+    stats, errors = extract_errors(stream, max_distinct)
+    report = dict(stats, distinct=len(errors))
+    report["errors"] = resolve(list(errors.values()), resolver)
+    return report
+
+def print_report(report, name):
+    print(f"📄 {name}: {report['lines']} lines, {report['error_lines']} error lines, "
+          f"{report['distinct']} distinct" + (f" ({report['dropped']} beyond the cap)" if report["dropped"] else ""))
+    for entry in report["errors"]:
+        print("\n" + "-"*70)
+        print(f"❗ line {entry['first_line']} (x{entry['count']}): {entry['error']}")
+        print(f"💡 [{entry['source']}]\n{entry['answer']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Triage a Cloud Build log.")
+    parser.add_argument("log", help="log file, or '-' for stdin")
+    parser.add_argument("--resolver", choices=["search", "context", "solve"], default="solve")
+    parser.add_argument("--max-distinct", type=int, default=MAX_DISTINCT)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    if args.log == "-":
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", errors="replace")
+    else:
+        stream = open(args.log, encoding="utf-8", errors="replace")
+    with stream:
+        report = triage_log(stream, args.resolver, args.max_distinct)
+    if args.json:
+        print(json.dumps(dict(report, source=args.log), ensure_ascii=False, indent=2))
+    else:
+        print_report(report, args.log)
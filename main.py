@@ -1,16 +1,60 @@
-from rag_agent import solve_error
+import argparse
+import asyncio
+import json
+import sys
 
-print("🚀 Gemini RAG Cloud Build Helper Ready!")
-print("Type 'exit' to quit.\n")
+import tracing
+from rag_agent import BATCH_CONCURRENCY, solve_error_stream, solve_errors_batch, warmup_in_background
 
-while True:
-    user_input = input("❓ Enter Cloud Build error: ")
+def read_errors(path):
+    """
+    One error per non-empty line, from a file or "-" for stdin.
+    """
+    source = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    with source:
+        return [line.strip() for line in source if line.strip()]
 
-    if user_input.lower() in ["exit", "quit"]:
-        break
+def run_batch(path, concurrency, output):
+    """
+    Triages every error in `path` and writes one JSON line per error, in input order.
+    """
+    errors = read_errors(path)
+    results = asyncio.run(solve_errors_batch(errors, concurrency=concurrency))
+    sink = sys.stdout if output == "-" else open(output, "w", encoding="utf-8")
+    with sink:
+        for result in results:
+            sink.write(json.dumps(result, ensure_ascii=False) + "\n")
+    print(f"✅ Triaged {len(errors)} errors", file=sys.stderr)
 
-    print("\n⏳ Thinking...\n")
-    answer = solve_error(user_input)
-    print("💡 Suggested Fix:\n")
-    print(answer)
-    print("\n" + "-"*70 + "\n")
+def run_interactive():
+    print("🚀 Gemini RAG Cloud Build Helper Ready!")
+    print("Type 'exit' to quit.\n")
+
+    while True:
+        user_input = input("❓ Enter Cloud Build error: ")
+
+        if user_input.lower() in ["exit", "quit"]:
+            break
+
+        print("\n⏳ Thinking...\n")
+        print("💡 Suggested Fix:\n")
+        for chunk in solve_error_stream(user_input):
+            print(chunk, end="", flush=True)
+        print()
+        print("\n" + "-"*70 + "\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gemini RAG Cloud Build helper.")
+    parser.add_argument("--batch", metavar="FILE", help="triage errors from FILE (one per line, '-' for stdin)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--output", default="-", help="JSON lines output file (default: stdout)")
+    args = parser.parse_args()
+
+    if args.batch:
+        run_batch(args.batch, args.concurrency, args.output)
+    else:
+        # Load the model and pre-embed the known catalog errors while the user types
+        warmup_in_background()
+        run_interactive()
+    if tracing.is_enabled():
+        tracing.print_metrics(file=sys.stderr)
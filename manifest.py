@@ -0,0 +1,69 @@
+# manifest.py
+import hashlib
+import json
+import os
+
+from atomic import atomic_write
+
+# Per-source record of what is already in ./vectordb, so re-ingestion only
+# embeds chunks that are new or changed.
+MANIFEST_PATH = "./vectordb/ingest_manifest.json"
+
+def snapshot_path(collection: str) -> str:
+    """
+    Per-version copy of the manifest, restored on rollback.
+    """
+    return os.path.join(os.path.dirname(MANIFEST_PATH), "manifests", f"{collection}.json")
+
+def file_hash(path: str) -> str:
+    """
+    SHA-256 of the file contents, read in 1 MB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def chunk_id(source: str, chunk: str) -> str:
+    """
+    Content-addressed chunk id: identical text from the same source always
+    maps to the same id, so unchanged chunks are never re-embedded.
+    """
+    return hashlib.sha256(f"{source}\0{chunk}".encode("utf-8")).hexdigest()[:32]
+
+def source_key(path: str) -> str:
+    return os.path.normpath(path)
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    """
+    Returns {"generation": int, "metadata_version": int, "collection": physical,
+    "sources": {source: {"file_hash", "chunks"}}}.
+    """
+    if not os.path.exists(path):
+        return {"generation": 0, "metadata_version": 1, "sources": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest: dict, path: str = MANIFEST_PATH):
+    """
+    Writes the manifest atomically (temp file + rename).
+    """
+    with atomic_write(path, encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+_generation = (None, 0)  # (manifest mtime_ns, generation)
+
+def corpus_version(path: str = MANIFEST_PATH) -> int:
+    """
+    Current ingestion generation; bumped by every ingest that changed the
+    collection. Re-reads the manifest only when its mtime changes.
+    """
+    global _generation
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+    if mtime != _generation[0]:
+        _generation = (mtime, load_manifest(path)["generation"])
+    return _generation[1]
@@ -1,36 +1,19 @@
 from google.adk.web import WebAgent
 from google.adk.tools import VertexAiSearchTool, Tool
-from sentence_transformers import SentenceTransformer
-import chromadb
-from PyPDF2 import PdfReader
 from googlesearch import search  # pip install googlesearch-python
 
-# --- Step 1: Ingest PDF as RAG ---
-PDF_PATH = "./data/cloudbuild_errors.pdf"
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-client = chromadb.PersistentClient(path="./vectordb")
-collection = client.get_or_create_collection("cloud_errors")
-
-def chunk_text(text, size=500):
-    return [text[i:i+size] for i in range(0, len(text), size)]
-
-def ingest_pdf():
-    reader = PdfReader(PDF_PATH)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n"
-    chunks = chunk_text(text)
-    for i, chunk in enumerate(chunks):
-        embedding = embedder.encode(chunk).tolist()
-        collection.add(ids=[str(i)], documents=[chunk], embeddings=[embedding])
-    print("✅ PDF ingested!")
+# --- Step 1: Ingest PDF as RAG (batched, shared with ingest.py) ---
+from ingest import COLLECTION_NAME, ingest_pdf
+from resources import AliasedCollection, encode
 
 ingest_pdf()
 
+collection = AliasedCollection(COLLECTION_NAME)
+
 # --- Step 2: Vertex AI Search Tool for PDF ---
 pdf_search_tool = VertexAiSearchTool(
     collection=collection,
-    embedding_model=embedder.encode,
+    embedding_model=encode,
     top_k=3
 )
 
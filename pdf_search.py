@@ -1,16 +1,119 @@
-import re
-from pypdf import PdfReader
+import hashlib
+import os
+import pickle
+import threading
+
+from atomic import atomic_write
+from manifest import file_hash
 
 PDF_PATH = "CloudBuildTroubleshootingPlaybook.pdf"
+MAX_RESULTS = 5
+
+# Extracted page text + search index, reused until the PDF changes
+CACHE_DIR = "./.cache/pdf_search"
+CACHE_VERSION = 1
+
+def build_trigram_index(lowered_lines):
+    """
+    Maps every 3-character substring to the sorted list of line numbers
+    that contain it.
+    """
+    index = {}
+    for number, line in enumerate(lowered_lines):
+        for gram in {line[i:i+3] for i in range(len(line) - 2)}:
+            index.setdefault(gram, []).append(number)
+    return index
+
+def _cache_path(pdf_path):
+    key = hashlib.sha1(os.path.abspath(pdf_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"{os.path.basename(pdf_path)}.{key}.pickle")
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    return cached if cached.get("version") == CACHE_VERSION else None
+
+def _write_cache(cache_path, entry):
+    with atomic_write(cache_path, "wb") as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_pdf(pdf_path=PDF_PATH):
+    """
+    Returns (page_texts, trigram_index) for the PDF. The cache entry is
+    trusted when size and mtime match; otherwise the content hash decides
+    whether the PDF really changed and needs to be re-parsed.
+    """
+    stat = os.stat(pdf_path)
+    cache_path = _cache_path(pdf_path)
+    cached = _read_cache(cache_path)
+    if cached and (cached["size"], cached["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+        return cached["pages"], cached["index"]
+
+    digest = file_hash(pdf_path)
+    if cached and cached["sha256"] == digest:
+        # touched but not modified: refresh the stat key only
+        cached.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        _write_cache(cache_path, cached)
+        return cached["pages"], cached["index"]
+
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_path)
+    pages = [text for text in (page.extract_text() for page in reader.pages) if text]
+    index = build_trigram_index([line.lower() for line in "".join(text + "\n" for text in pages).split("\n")])
+    _write_cache(cache_path, {
+        "version": CACHE_VERSION,
+        "path": os.path.abspath(pdf_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest,
+        "pages": pages,
+        "index": index,
+    })
+    return pages, index
+
+# (lines, lowered_lines, trigram_index), loaded on first search or preload()
+_index = None
+_index_lock = threading.Lock()
 
-# Load PDF once
-reader = PdfReader(PDF_PATH)
-pdf_text = ""
+def get_index():
+    """
+    Loads the PDF (from cache when unchanged) and builds the line list once.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                pages, trigram_index = load_pdf(PDF_PATH)
+                lines = "".join(page_text + "\n" for page_text in pages).split("\n")
+                _index = (lines, [line.lower() for line in lines], trigram_index)
+    return _index
+
+def preload() -> threading.Thread:
+    thread = threading.Thread(target=get_index, name="pdf-search-preload", daemon=True)
+    thread.start()
+    return thread
 
-for page in reader.pages:
-    page_text = page.extract_text()
-    if page_text:
-        pdf_text += page_text + "\n"
+def _candidate_lines(needle: str, line_count: int, trigram_index: dict):
+    """
+    Line numbers that contain every trigram of the (lowercased) needle,
+    found by intersecting posting lists smallest-first.
+    """
+    if len(needle) < 3:
+        return range(line_count)
+    grams = {needle[i:i+3] for i in range(len(needle) - 2)}
+    postings = sorted((trigram_index.get(gram, []) for gram in grams), key=len)
+    if not postings[0]:
+        return []
+    candidates = set(postings[0])
+    for posting in postings[1:]:
+        candidates.intersection_update(posting)
+        if not candidates:
+            return []
+    return sorted(candidates)
 
 def search_pdf(query: str) -> str:
     """
@@ -20,11 +123,16 @@ def search_pdf(query: str) -> str:
     if not query.strip():
         return "No query detected."
 
-    pattern = re.compile(re.escape(query), re.IGNORECASE)
-    lines = pdf_text.split("\n")
-    results = [line for line in lines if pattern.search(line)]
+    lines, lowered_lines, trigram_index = get_index()
+    needle = query.lower()
+    results = []
+    for number in _candidate_lines(needle, len(lines), trigram_index):
+        if needle in lowered_lines[number]:
+            results.append(lines[number])
+            if len(results) == MAX_RESULTS:  # return top 5 matches
+                break
 
     if results:
-        return "\n".join(results[:5])  # return top 5 matches
+        return "\n".join(results)
 
     return "No matching error found in the PDF."
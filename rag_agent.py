@@ -1,26 +1,214 @@
-from agent import ask_gemini
-from sentence_transformers import SentenceTransformer
-import chromadb
+import asyncio
+import os
+import threading
+from collections import OrderedDict
 
-# Embedding + vector DB
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-client = chromadb.PersistentClient(path="./vectordb")
-collection = client.get_collection("cloud_errors")
+from agent import ask_gemini, ask_gemini_async, ask_gemini_stream
+from aliases import resolve_alias
+import bm25
+from categories import classify, in_shards, shard_filter
+from embed_batcher import EmbeddingBatcher
+from catalog import FAST_PATH, error_signatures, estimate_tokens, format_fix, match_known_error
+from manifest import corpus_version
+from resources import forget_vector_store, get_embedder, get_vector_store, preload
+from response_cache import ResponseCache
+from tracing import span
 
-def retrieve_context(query: str, top_k: int = 3) -> str:
+COLLECTION_NAME = "cloud_errors"
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid")  # "hybrid" or "dense"
+FUSION_CANDIDATES = 20  # per retriever, before reciprocal rank fusion
+RRF_K = 60
+CATEGORY_FILTER = os.environ.get("CATEGORY_FILTER", "1") != "0"  # restrict retrieval to the query's shards
+QUERY_CACHE_SIZE = 1024  # normalized query -> embedding
+BATCH_CONCURRENCY = 8  # concurrent Gemini calls in solve_errors_batch
+EMBED_MAX_BATCH = int(os.environ.get("EMBED_MAX_BATCH", "32"))  # queries per batched encode
+EMBED_MAX_WAIT_MS = float(os.environ.get("EMBED_MAX_WAIT_MS", "5"))  # 0 encodes each query on its own
+
+# Query embeddings shared by every retrieval caller (LRU)
+_query_embeddings = OrderedDict()
+_query_lock = threading.Lock()
+
+def normalize_query(query: str) -> str:
     """
-    Finds top-k most relevant PDF chunks for the query.
+    Collapses whitespace and case. all-MiniLM-L6-v2 is uncased, so the
+    embedding of the normalized text is the same as the original's.
     """
-    query_embedding = embedder.encode(query).tolist()
-    results = collection.query(query_embeddings=[query_embedding], n_results=top_k)
-    return "\n\n".join(results["documents"][0])
+    return " ".join(query.split()).lower()
+
+def _remember(key, embedding):
+    embedding.flags.writeable = False  # shared between callers
+    _query_embeddings[key] = embedding
+    _query_embeddings.move_to_end(key)
+    while len(_query_embeddings) > QUERY_CACHE_SIZE:
+        _query_embeddings.popitem(last=False)
 
-def solve_error(user_query: str) -> str:
+# Concurrent cache misses share one batched encode
+_batcher = None
+_batcher_lock = threading.Lock()
+
+def get_query_batcher() -> EmbeddingBatcher:
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = EmbeddingBatcher(
+                    lambda texts: get_embedder().encode(texts, batch_size=len(texts)),
+                    max_batch=EMBED_MAX_BATCH,
+                    max_wait=EMBED_MAX_WAIT_MS / 1000,
+                )
+    return _batcher
+
+def embed_query(query: str):
     """
-    Retrieves context from PDF and asks Gemini to produce a fix.
+    Returns the query embedding, encoding it only on a cache miss. Misses
+    from concurrent callers are micro-batched unless EMBED_MAX_WAIT_MS=0.
+    """
+    key = normalize_query(query)
+    with span("rag.embed_query") as stage:
+        with _query_lock:
+            embedding = _query_embeddings.get(key)
+            if embedding is not None:
+                _query_embeddings.move_to_end(key)
+                stage.set("cache_hit", True)
+                return embedding
+        stage.set("cache_hit", False)
+        if EMBED_MAX_WAIT_MS > 0:
+            embedding = get_query_batcher().encode(key)
+        else:
+            embedding = get_embedder().encode(key)
+        with _query_lock:
+            _remember(key, embedding)
+        return embedding
+
+def prime_query_cache(queries, batch_size: int = 64) -> int:
+    """
+    Pre-computes embeddings for known queries (e.g. catalog.error_signatures())
+    in one batched encode. Returns how many were added.
+    """
+    with _query_lock:
+        keys = list(dict.fromkeys(k for k in map(normalize_query, queries) if k not in _query_embeddings))
+    if not keys:
+        return 0
+    embeddings = get_embedder().encode(keys, batch_size=batch_size)
+    with _query_lock:
+        for key, embedding in zip(keys, embeddings):
+            _remember(key, embedding)
+    return len(keys)
+
+def warmup(prime_catalog: bool = True):
+    """
+    Runs a dummy encode so the first real query doesn't pay lazy model
+    initialization, and optionally primes the cache with the error catalog.
+    """
+    get_embedder().encode("warmup")
+    if prime_catalog:
+        prime_query_cache(error_signatures())
+
+def warmup_in_background(prime_catalog: bool = True):
+    """
+    preload() plus warmup() on a daemon thread, so the CLI can show its
+    first prompt before the model has finished loading.
+    """
+    preload(embedder=False)
+    thread = threading.Thread(target=warmup, args=(prime_catalog,), name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+# Answers for near-duplicate queries, invalidated on re-ingestion
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> ResponseCache:
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
+
+# Version of the collection the alias points to; re-ingestion builds a new
+# one and swaps the alias, so readers switch over between two queries.
+_live_collection = None
+
+def _live_store():
+    global _live_collection
+    physical = resolve_alias(COLLECTION_NAME)
+    if physical != _live_collection:
+        if _live_collection is not None:
+            forget_vector_store(_live_collection)
+        _live_collection = physical
+    return get_vector_store(physical)
+
+# Lexical index written by ingest.py; reloaded when a re-ingest replaces it
+_bm25_index = None
+_bm25_mtime = None
+
+def _load_bm25():
+    global _bm25_index, _bm25_mtime
+    path = bm25.index_path(resolve_alias(COLLECTION_NAME))
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if mtime != _bm25_mtime:
+        _bm25_index, _bm25_mtime = bm25.BM25Index.load(path), mtime
+    return _bm25_index
+
+def reciprocal_rank_fusion(rankings, top_k, k=RRF_K):
+    """
+    Fuses ranked lists of (id, document) by summing 1 / (k + rank).
     """
-    context = retrieve_context(user_query)
-    prompt = f"""
+    scores, documents = {}, {}
+    for ranking in rankings:
+        for rank, (chunk_id, document) in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+            documents[chunk_id] = document
+    best = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [(chunk_id, documents[chunk_id]) for chunk_id in best]
+
+def retrieve(query: str, top_k: int = 3, mode: str = RETRIEVAL_MODE, query_embedding=None, shards=None) -> list:
+    """
+    Returns the top-k (chunk_id, document) pairs for the query. "hybrid"
+    fuses BM25 and dense rankings, so exact tokens like INTERNAL_ERROR or
+    iam.serviceAccounts.actAs are found even when the embedding misses them.
+    Both rankings are restricted to `shards` (default: categories.classify
+    of the query, when CATEGORY_FILTER is on); if those shards cannot fill
+    top_k, the search runs over the whole collection instead.
+    """
+    if shards is None:
+        shards = classify(query) if CATEGORY_FILTER else []
+    with span("rag.retrieve", mode=mode, top_k=top_k, shards=shards) as stage:
+        lexical = _load_bm25() if mode == "hybrid" else None
+        n_results = FUSION_CANDIDATES if lexical else top_k
+        if query_embedding is None:
+            query_embedding = embed_query(query)
+        where = shard_filter(shards)
+        with span("rag.vector_query", n_results=n_results, filtered=where is not None):
+            results = _live_store().query(
+                query_embeddings=[query_embedding.tolist()], n_results=n_results, where=where
+            )
+        dense = list(zip(results["ids"][0], results["documents"][0]))
+        if where is not None and len(dense) < top_k:
+            stage.set("fallback", True)
+            return retrieve(query, top_k, mode, query_embedding, shards=[])
+        if lexical:
+            accept = (lambda metadata: in_shards(metadata, shards)) if shards else None
+            with span("rag.bm25_query", n_results=FUSION_CANDIDATES):
+                sparse = [(chunk_id, document) for chunk_id, document, _ in lexical.search(query, FUSION_CANDIDATES, accept)]
+            hits = reciprocal_rank_fusion([dense, sparse], top_k)
+        else:
+            hits = dense[:top_k]
+        stage.set("chunk_ids", [chunk_id for chunk_id, _ in hits])
+        return hits
+
+def retrieve_context(query: str, top_k: int = 3, mode: str = RETRIEVAL_MODE) -> str:
+    """
+    Finds top-k most relevant PDF chunks for the query.
+    """
+    return "\n\n".join(document for _, document in retrieve(query, top_k, mode))
+
+def build_prompt(user_query: str, context: str) -> str:
+    return f"""
 You are a Google Cloud Build CI/CD troubleshooting assistant.
 
 User Error:
@@ -34,4 +222,112 @@ Provide:
 - Step-by-step fix
 - Example gcloud commands or YAML if needed
 """
-    return ask_gemini(prompt)
+
+def _prepare(user_query: str, use_cache: bool):
+    """
+    Shared front half of solve_error / solve_error_stream: embeds the query,
+    retrieves context and checks the answer cache. Returns
+    (query_embedding, chunk_ids, version, prompt, answer, source): answer is
+    set when source is "catalog" (a known catalog signature, answered
+    without retrieval or Gemini) or "cache"; otherwise source is "gemini"
+    and prompt is what to ask.
+    """
+    if FAST_PATH:
+        with span("rag.fast_path") as stage:
+            entry = match_known_error(user_query)
+            stage.set("hit", entry is not None)
+        if entry is not None:
+            return None, [], None, None, format_fix(entry), "catalog"
+    query_embedding = embed_query(user_query)
+    hits = retrieve(user_query, query_embedding=query_embedding)
+    chunk_ids = [chunk_id for chunk_id, _ in hits]
+    version = corpus_version()
+    if use_cache:
+        with span("rag.cache_lookup") as stage:
+            cached = get_response_cache().lookup(query_embedding, chunk_ids, version)
+            stage.set("hit", cached is not None)
+        if cached is not None:
+            return query_embedding, chunk_ids, version, None, cached, "cache"
+    with span("rag.prompt") as stage:
+        context = "\n\n".join(document for _, document in hits)
+        prompt = build_prompt(user_query, context)
+        if stage:
+            stage.set("prompt_tokens", estimate_tokens(prompt))
+            stage.set("chunk_ids", chunk_ids)
+    return query_embedding, chunk_ids, version, prompt, None, "gemini"
+
+def solve_error(user_query: str, use_cache: bool = True) -> str:
+    """
+    Retrieves context from PDF and asks Gemini to produce a fix.
+    Near-duplicates of an already answered query are served from the cache.
+    """
+    with span("rag.solve_error") as request:
+        query_embedding, chunk_ids, version, prompt, cached, source = _prepare(user_query, use_cache)
+        request.set("source", source)
+        if cached is not None:
+            return cached
+        answer = ask_gemini(prompt)
+        if use_cache:
+            get_response_cache().store(user_query, query_embedding, chunk_ids, answer, version)
+        return answer
+
+def solve_error_stream(user_query: str, use_cache: bool = True):
+    """
+    Like solve_error, but yields the answer in chunks as Gemini streams it.
+    """
+    with span("rag.prepare"):
+        query_embedding, chunk_ids, version, prompt, cached, _ = _prepare(user_query, use_cache)
+    if cached is not None:
+        yield cached
+        return
+    parts = []
+    for chunk in ask_gemini_stream(prompt):
+        parts.append(chunk)
+        yield chunk
+    if use_cache:
+        get_response_cache().store(user_query, query_embedding, chunk_ids, "".join(parts), version)
+
+async def solve_errors_batch(queries, concurrency: int = BATCH_CONCURRENCY, use_cache: bool = True) -> list:
+    """
+    Triages many errors at once. All queries are embedded in one batch,
+    retrieval and cache lookups run in worker threads, identical prompts
+    share a single Gemini call, and at most `concurrency` queries are being
+    prepared and `concurrency` Gemini calls are in flight. A failing query
+    only fails its own row. Returns one dict per query, in input order:
+    {"query", "answer", "source", "cached"} with source "catalog", "cache"
+    or "gemini", or {"query", "error"}.
+    """
+    queries = list(queries)
+    semaphore = asyncio.Semaphore(concurrency)
+    in_flight = {}  # prompt -> task, so duplicates are coalesced
+    stored = set()
+
+    async def ask(prompt):
+        async with semaphore:
+            return await ask_gemini_async(prompt)
+
+    async def solve(query):
+        try:
+            async with semaphore:
+                query_embedding, chunk_ids, version, prompt, answer, source = await asyncio.to_thread(
+                    _prepare, query, use_cache
+                )
+            if answer is None:
+                if prompt not in in_flight:
+                    in_flight[prompt] = asyncio.create_task(ask(prompt))
+                answer = await in_flight[prompt]
+                if use_cache and prompt not in stored:
+                    stored.add(prompt)
+                    await asyncio.to_thread(
+                        get_response_cache().store, query, query_embedding, chunk_ids, answer, version
+                    )
+        except Exception as exc:
+            return {"query": query, "error": repr(exc)}
+        return {"query": query, "answer": answer, "source": source, "cached": source == "cache"}
+
+    with span("rag.batch_prepare", queries=len(queries)):
+        try:
+            await asyncio.to_thread(prime_query_cache, queries)
+        except Exception:
+            pass  # each query embeds (and fails) on its own below
+    return list(await asyncio.gather(*(solve(query) for query in queries)))
@@ -0,0 +1,153 @@
+# resources.py
+import os
+import shutil
+import threading
+
+# Heavy shared resources, created on first use instead of at import time.
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+VECTORDB_PATH = "./vectordb"
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "chroma")  # "chroma" or "numpy"
+VECTOR_DTYPE = os.environ.get("VECTOR_DTYPE", "float32")  # numpy backend: "float32" or "float16"
+EMBED_DAEMON = os.environ.get("EMBED_DAEMON", "1") != "0"  # use embed_daemon.py when it is running
+
+_embedder = None
+_embedder_lock = threading.Lock()
+_chroma_client = None
+_chroma_lock = threading.Lock()
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_embedder():
+    """
+    The shared SentenceTransformer (fp32 or int8, see embeddings.py);
+    importing sentence_transformers and loading the model happen on the
+    first call only. If the embedding daemon answers on EMBED_SOCKET, this
+    is a client for it instead and the model is never loaded here.
+    """
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                from embeddings import load_embedder
+
+                def load():
+                    return load_embedder(EMBEDDING_MODEL)
+
+                if EMBED_DAEMON:
+                    import embed_daemon
+                    _embedder = embed_daemon.connect(fallback=load)
+                if _embedder is None:
+                    _embedder = load()
+    return _embedder
+
+def encode(sentences, **kwargs):
+    """
+    get_embedder().encode(), for callers that need an embedding function
+    up front (e.g. ADK tools) but should not load the model at import time.
+    """
+    return get_embedder().encode(sentences, **kwargs)
+
+def set_embedder(embedder):
+    """
+    Replaces the shared embedder (anything with a SentenceTransformer-style
+    encode()), e.g. the offline hashing embedder used by the benchmarks.
+    """
+    global _embedder
+    with _embedder_lock:
+        _embedder = embedder
+
+def get_chroma_client():
+    global _chroma_client
+    if _chroma_client is None:
+        with _chroma_lock:
+            if _chroma_client is None:
+                import chromadb
+                _chroma_client = chromadb.PersistentClient(path=VECTORDB_PATH)
+    return _chroma_client
+
+def get_collection(name: str, create: bool = False):
+    client = get_chroma_client()
+    return client.get_or_create_collection(name) if create else client.get_collection(name)
+
+class AliasedCollection:
+    """
+    A Chroma collection by logical name: every attribute access resolves
+    the alias again, so long-lived tools follow reindex swaps and never
+    hold a version that rollback or gc has dropped.
+    """
+    def __init__(self, name: str):
+        self.name = name
+
+    def __getattr__(self, attr):
+        from aliases import resolve_alias
+        return getattr(get_collection(resolve_alias(self.name)), attr)
+
+def _numpy_store_path(name):
+    return os.path.join(VECTORDB_PATH, "numpy", name)
+
+def get_vector_store(name: str, create: bool = False):
+    """
+    The shared VectorStore for a collection name, on the VECTOR_BACKEND
+    backend. Raises like get_collection() when it does not exist and
+    create is False.
+    """
+    store = _stores.get(name)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(name)
+            if store is None:
+                from vector_store import ChromaStore, NumpyStore
+                if VECTOR_BACKEND == "numpy":
+                    store = NumpyStore(_numpy_store_path(name), dtype=VECTOR_DTYPE, create=create)
+                else:
+                    store = ChromaStore(get_collection(name, create=create))
+                _stores[name] = store
+    return store
+
+def forget_vector_store(name: str):
+    """
+    Drops the cached handle (e.g. after an alias moved away from it).
+    """
+    with _stores_lock:
+        _stores.pop(name, None)
+
+def list_vector_stores(prefix: str = "") -> list:
+    """
+    Names of the collections on the active backend that start with prefix.
+    """
+    if VECTOR_BACKEND == "numpy":
+        root = os.path.join(VECTORDB_PATH, "numpy")
+        names = os.listdir(root) if os.path.isdir(root) else []
+    else:
+        names = [getattr(c, "name", c) for c in get_chroma_client().list_collections()]
+    return sorted(name for name in names if name.startswith(prefix))
+
+def delete_vector_store(name: str):
+    """
+    Drops a collection from the active backend, if it exists.
+    """
+    with _stores_lock:
+        _stores.pop(name, None)
+        if VECTOR_BACKEND == "numpy":
+            shutil.rmtree(_numpy_store_path(name), ignore_errors=True)
+            return
+    try:
+        get_chroma_client().delete_collection(name)
+    except Exception:
+        pass
+
+def preload(embedder: bool = True, chroma: bool = True) -> threading.Thread:
+    """
+    Loads the requested resources on a daemon thread so the first prompt
+    can be shown immediately; callers that need them sooner just block on
+    the accessor's lock.
+    """
+    def load():
+        if chroma and VECTOR_BACKEND == "chroma":
+            get_chroma_client()
+        if embedder:
+            get_embedder()
+
+    thread = threading.Thread(target=load, name="preload", daemon=True)
+    thread.start()
+    return thread
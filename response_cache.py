@@ -0,0 +1,119 @@
+# response_cache.py
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+CACHE_PATH = "./.cache/response_cache.sqlite3"
+
+class ResponseCache:
+    """
+    Persistent semantic cache of solve_error answers.
+
+    An entry is reused when the retrieved chunk ids are the same and the
+    query embedding's cosine similarity is at least `threshold`. Entries
+    expire after `ttl_seconds`, the least recently used ones are evicted
+    above `max_entries`, and everything is dropped when the corpus version
+    (see manifest.corpus_version) changes.
+    """
+    def __init__(self, path=CACHE_PATH, threshold=0.95, max_entries=512, ttl_seconds=7 * 24 * 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY,
+                query TEXT,
+                chunk_key TEXT,
+                embedding BLOB,
+                answer TEXT,
+                created REAL,
+                last_used REAL
+            );
+            CREATE INDEX IF NOT EXISTS answers_chunk_key ON answers (chunk_key);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+
+    @staticmethod
+    def _chunk_key(chunk_ids):
+        return "\n".join(sorted(chunk_ids))
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self, corpus_version):
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'corpus_version'").fetchone()
+        if row is None or row[0] != str(corpus_version):
+            self._db.execute("DELETE FROM answers")
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('corpus_version', ?)", (str(corpus_version),)
+            )
+            self._db.commit()
+
+    def lookup(self, embedding, chunk_ids, corpus_version):
+        """
+        Returns the cached answer for a near-duplicate query, or None.
+        """
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            self._check_version(corpus_version)
+            self._db.execute("DELETE FROM answers WHERE created < ?", (now - self.ttl_seconds,))
+            rows = self._db.execute(
+                "SELECT id, embedding, answer FROM answers WHERE chunk_key = ?", (self._chunk_key(chunk_ids),)
+            ).fetchall()
+            best_id, best_answer, best_score = None, None, self.threshold
+            for entry_id, blob, answer in rows:
+                score = float(np.dot(query, np.frombuffer(blob, dtype=np.float32)))
+                if score >= best_score:
+                    best_id, best_answer, best_score = entry_id, answer, score
+            if best_id is None:
+                self.misses += 1
+                self._db.commit()
+                return None
+            self.hits += 1
+            self._db.execute("UPDATE answers SET last_used = ? WHERE id = ?", (now, best_id))
+            self._db.commit()
+            return best_answer
+
+    def store(self, query, embedding, chunk_ids, answer, corpus_version):
+        now = time.time()
+        with self._lock:
+            self._check_version(corpus_version)
+            self._db.execute(
+                "INSERT INTO answers (query, chunk_key, embedding, answer, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (query, self._chunk_key(chunk_ids), self._normalize(embedding).tobytes(), answer, now, now),
+            )
+            self._db.execute(
+                "DELETE FROM answers WHERE id NOT IN "
+                "(SELECT id FROM answers ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": size,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM answers")
+            self._db.commit()
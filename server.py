@@ -0,0 +1,260 @@
+# server.py
+"""
+Local HTTP service around solve_error / search_pdf, so one warm process
+(model, vector store, caches) can serve many users concurrently.
+
+    python server.py --port 8080
+    curl -s localhost:8080/solve -d '{"error": "denied: Permission artifactregistry.repositories.uploadArtifacts"}'
+    curl -s localhost:8080/search -d '{"query": "INTERNAL_ERROR"}'
+    curl -s localhost:8080/healthz
+    curl -s localhost:8080/metrics
+
+Blocking work (embedding, vector search, Gemini) runs on a bounded thread pool.
+At most `max_pending` requests may be queued or running; beyond that the
+server answers 503 with Retry-After instead of building an unbounded
+backlog. Requests that exceed `timeout` seconds get a 504; their worker
+slot is only released once the underlying call has actually finished.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import pdf_search
+import tracing
+from agent import gemini_stats
+from rag_agent import get_query_batcher, get_response_cache, retrieve_context, solve_error, warmup_in_background
+
+HOST = os.environ.get("SERVER_HOST", "127.0.0.1")
+PORT = int(os.environ.get("SERVER_PORT", "8080"))
+WORKERS = int(os.environ.get("SERVER_WORKERS", "8"))  # threads running blocking model/DB work
+MAX_PENDING = int(os.environ.get("SERVER_MAX_PENDING", "64"))  # queued + running before 503
+REQUEST_TIMEOUT = float(os.environ.get("SERVER_TIMEOUT", "90"))  # seconds before 504
+MAX_BODY = 64 * 1024
+HEADER_TIMEOUT = 10  # seconds to receive the request line and headers
+MAX_TOP_K = 50
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+           504: "Gateway Timeout"}
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class Server:
+    def __init__(self, workers=WORKERS, max_pending=MAX_PENDING, timeout=REQUEST_TIMEOUT):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="solve")
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.started = time.time()
+        self.warmup = None
+        self.counters = {"requests": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+        self.routes = {
+            ("POST", "/solve"): self.solve,
+            ("POST", "/search"): self.search,
+            ("GET", "/healthz"): self.healthz,
+            ("GET", "/metrics"): self.metrics,
+        }
+
+    def start_warmup(self):
+        """
+        Loads the embedder, the vector DB client and the PDF index in the background;
+        /healthz reports "warming" until the model is ready.
+        """
+        self.warmup = warmup_in_background()
+        pdf_search.preload()
+
+    async def offload(self, call, *args):
+        """
+        Runs a blocking call on the pool with backpressure and a timeout.
+        """
+        if self.pending >= self.max_pending:
+            self.counters["rejected"] += 1
+            raise HTTPError(503, "server busy, retry later")
+        self.pending += 1
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()  # keeps worker spans under this request's span
+        future = loop.run_in_executor(self.executor, context.run, call, *args)
+
+        def release(_):
+            self.pending -= 1
+
+        future.add_done_callback(release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            raise HTTPError(504, f"request exceeded {self.timeout:g}s") from None
+
+    async def solve(self, body):
+        error = _required(body, "error")
+        answer = await self.offload(solve_error, error, bool(body.get("use_cache", True)))
+        return {"error": error, "answer": answer}
+
+    async def search(self, body):
+        query = _required(body, "query")
+        if body.get("source", "pdf") == "vector":
+            result = await self.offload(retrieve_context, query, _top_k(body))
+        else:
+            result = await self.offload(pdf_search.search_pdf, query)
+        return {"query": query, "result": result}
+
+    async def healthz(self, body):
+        ready = self.warmup is None or not self.warmup.is_alive()
+        return {"status": "ok" if ready else "warming", "pending": self.pending}
+
+    async def metrics(self, body):
+        report = {
+            "uptime_s": round(time.time() - self.started, 1),
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "workers": self.workers,
+            "server": dict(self.counters),
+            "gemini": gemini_stats(),
+            "spans": tracing.metrics(),
+        }
+        cache = get_response_cache()
+        report["response_cache"] = {"hits": cache.hits, "misses": cache.misses}
+        report["embed_batcher"] = get_query_batcher().stats()
+        return report
+
+    async def handle(self, reader, writer):
+        """
+        Serves requests on one connection until the client closes it or
+        asks for Connection: close.
+        """
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), HEADER_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, ValueError):
+                    return
+                except HTTPError as exc:
+                    await _respond(writer, exc.status, {"detail": str(exc)}, keep_alive=False)
+                    return
+                if request is None:
+                    return
+                method, path, headers, body = request
+                status, payload = await self.dispatch(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await _respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, raw_body):
+        self.counters["requests"] += 1
+        path = path.split("?", 1)[0]
+        handler = self.routes.get((method, path))
+        with tracing.span("http.request", method=method, path=path) as stage:
+            try:
+                if handler is None:
+                    known = any(route_path == path for _, route_path in self.routes)
+                    raise HTTPError(405 if known else 404, f"{method} {path} not supported")
+                body = _parse_json(raw_body) if method == "POST" else {}
+                status, payload = 200, await handler(body)
+            except HTTPError as exc:
+                status, payload = exc.status, {"detail": str(exc)}
+            except Exception as exc:
+                self.counters["errors"] += 1
+                stage.set("error", repr(exc))
+                traceback.print_exc(file=sys.stderr)
+                status, payload = 500, {"detail": "internal server error"}
+            stage.set("status", status)
+        return status, payload
+
+def _top_k(body):
+    value = body.get("top_k", 3)
+    if not isinstance(value, int) or isinstance(value, bool) or not 1 <= value <= MAX_TOP_K:
+        raise HTTPError(400, f'"top_k" must be an integer from 1 to {MAX_TOP_K}')
+    return value
+
+def _required(body, key):
+    value = body.get(key)
+    if not isinstance(value, str) or not value.strip():
+        raise HTTPError(400, f'"{key}" must be a non-empty string')
+    return value
+
+def _parse_json(raw_body):
+    try:
+        body = json.loads(raw_body or b"{}")
+    except ValueError:
+        raise HTTPError(400, "body must be JSON") from None
+    if not isinstance(body, dict):
+        raise HTTPError(400, "body must be a JSON object")
+    return body
+
+async def _read_request(reader):
+    """
+    Returns (method, path, headers, body), or None when the client closed
+    the connection between requests.
+    """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "invalid Content-Length") from None
+    if length > MAX_BODY:
+        raise HTTPError(413, f"body larger than {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, headers, body
+
+async def _respond(writer, status, payload, keep_alive=True):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = [
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+        "Content-Type: application/json; charset=utf-8",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    if status == 503:
+        head.append("Retry-After: 1")
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+    try:
+        await writer.drain()
+    except ConnectionError:
+        pass
+
+async def serve(host=HOST, port=PORT, workers=WORKERS, max_pending=MAX_PENDING, timeout=REQUEST_TIMEOUT):
+    server = Server(workers, max_pending, timeout)
+    server.start_warmup()
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f"🚀 Serving on http://{host}:{port} ({workers} workers, {max_pending} max pending)", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP service for solve_error and search_pdf.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING)
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_pending, args.timeout))
+    except KeyboardInterrupt:
+        pass
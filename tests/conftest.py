@@ -0,0 +1,72 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+
+# the modules live flat in the repo root; lets a plain `pytest` import them
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """
+    An empty working directory with the NumPy vector store and the offline
+    hashing embedder, so ingest and retrieval need neither Chroma nor a model.
+    """
+    import aliases
+    import manifest
+    import resources
+    from benchmarks.hash_embedder import HashingEmbedder
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(resources, "VECTOR_BACKEND", "numpy")
+    monkeypatch.setattr(resources, "_stores", {})
+    monkeypatch.setattr(resources, "_embedder", HashingEmbedder())
+    monkeypatch.setattr(aliases, "_cache", (None, {}))
+    monkeypatch.setattr(manifest, "_generation", (None, 0))
+    return tmp_path
+
+def _pdf_string(line):
+    return "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+def write_pdf(path, pages):
+    """
+    Writes a minimal PDF with one Helvetica text line per line of each page.
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        body = "BT /F1 9 Tf 12 TL 20 800 Td " + " ".join(f"{_pdf_string(line)} Tj T*" for line in text.split("\n")) + " ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents {len(objects)} 0 R "
+                       "/Resources << /Font << /F1 3 0 R >> >> >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+    data, offsets = b"%PDF-1.4\n", []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, "wb") as f:
+        f.write(data)
+
+def runbook(name, lines=40, variant=""):
+    """
+    Page text for a fake runbook; different names never share a line.
+    """
+    return "\n".join(f"{name} step {i}: error E{i:03d}{variant} means retry the {name} build" for i in range(lines))
+
+@pytest.fixture
+def make_pdf(workspace):
+    """
+    make_pdf(path, name, lines=40, variant="") writes a one-page runbook
+    PDF under the workspace and returns its relative path.
+    """
+    def make(path, name, lines=40, variant=""):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        write_pdf(path, [runbook(name, lines, variant)])
+        return path
+    return make
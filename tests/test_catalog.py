@@ -0,0 +1,33 @@
+# tests/test_catalog.py
+import pytest
+
+import catalog
+
+@pytest.fixture(scope="module")
+def matcher():
+    return catalog.CatalogMatcher(catalog.parse_catalog())
+
+def test_every_signature_matches_itself(matcher):
+    for entry in matcher.entries:
+        assert matcher.match(entry.signature) is entry
+
+@pytest.mark.parametrize("text, signature", [
+    ("Step #3: ERROR: build step 0 failed with status = INTERNAL_ERROR", "Internal Error (status = INTERNAL_ERROR)"),
+    ("Back-off restarting failed container: CrashLoopBackOff", "CrashLoopBackOff"),
+    ("ERROR: (gcloud.run.deploy) Missing necessary permission iam.serviceAccounts.actAs on the SA",
+     "Missing necessary permission iam.serviceAccounts.actAs"),
+    ("AccessDenied: 403 caller does not have storage.objects.get.", "AccessDenied … storage.objects.get"),
+])
+def test_known_errors(matcher, text, signature):
+    assert matcher.match(text).signature == signature
+
+@pytest.mark.parametrize("text", [
+    "docker pull gcr.io/foo: manifest unknown",
+    "UNAUTHENTICATED: Request had invalid authentication credentials",
+    "Cannot find module 'express' (tsconfig missing)",
+    "error: unauthenticated",
+    "CrashLoopBackOffs are annoying",
+    "my jest: command not founder",
+])
+def test_near_misses_fall_through(matcher, text):
+    assert matcher.match(text) is None
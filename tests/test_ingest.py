@@ -0,0 +1,138 @@
+# tests/test_ingest.py
+import os
+
+import pytest
+
+import ingest
+import resources
+import bm25
+from aliases import load_aliases, resolve_alias
+from manifest import load_manifest, snapshot_path
+
+class CountingEmbedder:
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.encoded = 0
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        self.encoded += 1 if isinstance(sentences, str) else len(sentences)
+        return self.embedder.encode(sentences, batch_size=batch_size, **kwargs)
+
+@pytest.fixture
+def counting(workspace, monkeypatch):
+    embedder = CountingEmbedder(resources.get_embedder())
+    monkeypatch.setattr(resources, "_embedder", embedder)
+    return embedder
+
+def live_store():
+    return resources.get_vector_store(resolve_alias(ingest.COLLECTION_NAME))
+
+@pytest.fixture
+def versions(monkeypatch):
+    """
+    Sequential version names; timestamps can repeat within a fast test.
+    """
+    made = []
+
+    def versioned_name(name):
+        made.append(f"{name}_v{len(made):03d}")
+        return made[-1]
+
+    monkeypatch.setattr(ingest, "versioned_name", versioned_name)
+    return made
+
+def test_unchanged_pdf_is_a_noop_without_opening_the_store(make_pdf, monkeypatch, capsys):
+    path = make_pdf("runbook.pdf", "alpha")
+    ingest.ingest_pdf(path)
+    live = resolve_alias(ingest.COLLECTION_NAME)
+
+    def no_store(*args, **kwargs):
+        raise AssertionError("vector store opened for an unchanged PDF")
+
+    monkeypatch.setattr(ingest, "get_vector_store", no_store)
+    ingest.ingest_pdf(path)
+    assert "nothing to ingest" in capsys.readouterr().out
+    assert resolve_alias(ingest.COLLECTION_NAME) == live
+
+def test_changed_pdf_only_embeds_new_chunks(make_pdf, counting):
+    path = make_pdf("runbook.pdf", "alpha", lines=40)
+    ingest.ingest_pdf(path)
+    first = counting.encoded
+    assert live_store().count() == first
+
+    make_pdf("runbook.pdf", "alpha", lines=60)  # appended steps: only the tail chunks change
+    ingest.ingest_pdf(path)
+    entry = load_manifest()["sources"]["runbook.pdf"]
+    assert 0 < counting.encoded - first < len(entry["chunks"])
+    assert sorted(live_store().get(include=[])["ids"]) == sorted(entry["chunks"])
+    assert "step 59" in " ".join(live_store().get()["documents"])
+
+def test_deleted_pdf_is_pruned(make_pdf, capsys):
+    make_pdf("pdfs/a.pdf", "alpha")
+    make_pdf("pdfs/b.pdf", "beta")
+    ingest.ingest_directory("pdfs", workers=1)
+    assert {m["source"] for m in live_store().get()["metadatas"]} == {"pdfs/a.pdf", "pdfs/b.pdf"}
+    b_chunks = len(load_manifest()["sources"]["pdfs/b.pdf"]["chunks"])
+
+    os.remove("pdfs/b.pdf")
+    ingest.ingest_directory("pdfs", workers=1)
+    assert f"0 embedded, 0 unchanged, {b_chunks} removed" in capsys.readouterr().out
+    manifest = load_manifest()
+    assert set(manifest["sources"]) == {"pdfs/a.pdf"}
+    stored = live_store().get()
+    assert {m["source"] for m in stored["metadatas"]} == {"pdfs/a.pdf"}
+    assert sorted(stored["ids"]) == sorted(manifest["sources"]["pdfs/a.pdf"]["chunks"])
+
+    ingest.ingest_directory("pdfs", workers=1)
+    assert "nothing to ingest" in capsys.readouterr().out
+
+def test_directory_with_more_pdfs_than_in_flight_slots(make_pdf):
+    names = [f"runbook{i}" for i in range(5)]  # workers=1 keeps at most 2 in flight
+    for name in names:
+        make_pdf(f"pdfs/{name}.pdf", name, lines=10)
+    ingest.ingest_directory("pdfs", workers=1)
+    assert set(load_manifest()["sources"]) == {f"pdfs/{name}.pdf" for name in names}
+    assert live_store().count() == sum(len(entry["chunks"]) for entry in load_manifest()["sources"].values())
+
+def test_rollback_restores_previous_version_and_manifest(make_pdf, versions):
+    path = make_pdf("runbook.pdf", "alpha", lines=40)
+    ingest.ingest_pdf(path)
+    first = load_manifest()
+    make_pdf("runbook.pdf", "alpha", lines=60)
+    ingest.ingest_pdf(path)
+    second = load_manifest()
+    assert resolve_alias(ingest.COLLECTION_NAME) == versions[1]
+
+    assert ingest.rollback() == versions[0]
+    assert resolve_alias(ingest.COLLECTION_NAME) == versions[0]
+    manifest = load_manifest()
+    assert manifest["sources"] == first["sources"]
+    assert manifest["generation"] > second["generation"]  # caches keyed on the corpus version are dropped
+    assert "step 59" not in " ".join(live_store().get()["documents"])
+    with pytest.raises(ValueError):
+        ingest.rollback()
+
+    ingest.ingest_pdf(path)  # the manifest is back on the old hash, so the new file is synced again
+    assert "step 59" in " ".join(live_store().get()["documents"])
+
+def test_gc_keeps_live_and_recent_rollback_targets(make_pdf, versions):
+    path = make_pdf("runbook.pdf", "alpha", lines=40)
+    for lines in (40, 50, 60):
+        make_pdf("runbook.pdf", "alpha", lines=lines)
+        ingest.ingest_pdf(path)
+    leftover = ingest.COLLECTION_NAME + "_v999"  # a failed build
+    resources.get_vector_store(leftover, create=True).flush()
+    prefix = ingest.COLLECTION_NAME + "_v"
+    assert set(resources.list_vector_stores(prefix)) == {*versions, leftover}
+
+    assert ingest.gc_versions(keep=1) == [versions[0], leftover]
+    assert set(resources.list_vector_stores(prefix)) == set(versions[1:])
+    assert load_aliases()[ingest.COLLECTION_NAME] == {"current": versions[2], "history": [versions[1]]}
+    assert not os.path.exists(snapshot_path(versions[0]))
+    assert not os.path.exists(bm25.index_path(versions[0]))
+
+    assert ingest.gc_versions(keep=0) == [versions[1]]
+    assert resources.list_vector_stores(prefix) == [versions[2]]
+    with pytest.raises(ValueError):
+        ingest.rollback()
+    assert live_store().count() == len(load_manifest()["sources"]["runbook.pdf"]["chunks"])
@@ -0,0 +1,56 @@
+# tests/test_pdf_search.py
+import os
+import re
+import shutil
+from functools import lru_cache
+
+import pytest
+from pypdf import PdfReader
+
+import catalog
+import pdf_search
+
+PLAYBOOK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), pdf_search.PDF_PATH)
+
+@lru_cache(maxsize=None)
+def pdf_lines(pdf_path, mtime_ns):
+    pdf_text = "".join(text + "\n" for text in (page.extract_text() for page in PdfReader(pdf_path).pages) if text)
+    return pdf_text.split("\n")
+
+def regex_scan(pdf_path, query):
+    """
+    The original search_pdf: a case-insensitive regex over every line.
+    """
+    if not query.strip():
+        return "No query detected."
+    pattern = re.compile(re.escape(query), re.IGNORECASE)
+    lines = pdf_lines(os.path.abspath(pdf_path), os.stat(pdf_path).st_mtime_ns)
+    results = [line for line in lines if pattern.search(line)]
+    return "\n".join(results[:5]) if results else "No matching error found in the PDF."
+
+@pytest.fixture
+def playbook(workspace, monkeypatch):
+    shutil.copy(PLAYBOOK, "playbook.pdf")
+    monkeypatch.setattr(pdf_search, "PDF_PATH", "playbook.pdf")
+    monkeypatch.setattr(pdf_search, "_index", None)
+    return "playbook.pdf"
+
+QUERIES = catalog.error_signatures() + [
+    "INTERNAL_ERROR", "internal_error", "Permission", "denied", "iam", "ab", "a", "", "   ",
+    "no such error anywhere", "(", "e.g.", "404 :",
+]
+
+def test_search_pdf_matches_the_regex_scan(playbook):
+    mismatches = [query for query in QUERIES if pdf_search.search_pdf(query) != regex_scan(playbook, query)]
+    assert mismatches == []
+
+def test_cache_follows_pdf_changes(make_pdf, monkeypatch):
+    make_pdf("runbook.pdf", "alpha", lines=5)
+    monkeypatch.setattr(pdf_search, "PDF_PATH", "runbook.pdf")
+    monkeypatch.setattr(pdf_search, "_index", None)
+    assert "alpha step 3" in pdf_search.search_pdf("E003")
+
+    make_pdf("runbook.pdf", "beta", lines=5)
+    monkeypatch.setattr(pdf_search, "_index", None)  # a new process, same on-disk cache
+    assert pdf_search.search_pdf("E003") == regex_scan("runbook.pdf", "E003")
+    assert "beta step 3" in pdf_search.search_pdf("E003")
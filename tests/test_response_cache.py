@@ -0,0 +1,52 @@
+# tests/test_response_cache.py
+import pytest
+
+import response_cache
+from response_cache import ResponseCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    return now
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return ResponseCache(str(tmp_path / "cache.sqlite3"), threshold=0.95, max_entries=3, ttl_seconds=60)
+
+def test_near_duplicate_with_same_chunks_hits(cache):
+    cache.store("q", [1.0, 0.0], ["b", "a"], "answer", corpus_version="v1")
+    assert cache.lookup([0.99, 0.05], ["a", "b"], "v1") == "answer"
+    assert cache.lookup([0.0, 1.0], ["a", "b"], "v1") is None
+    assert cache.lookup([1.0, 0.0], ["a", "c"], "v1") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.store("q", [1.0, 0.0], ["a"], "answer", corpus_version="v1")
+    clock[0] += 59
+    assert cache.lookup([1.0, 0.0], ["a"], "v1") == "answer"
+    clock[0] += 2  # expiry counts from creation, not last use
+    assert cache.lookup([1.0, 0.0], ["a"], "v1") is None
+    assert cache.stats()["entries"] == 0
+
+def test_corpus_version_change_drops_everything(cache):
+    cache.store("q", [1.0, 0.0], ["a"], "answer", corpus_version="v1")
+    assert cache.lookup([1.0, 0.0], ["a"], "v2") is None
+    assert cache.stats()["entries"] == 0
+    assert cache.lookup([1.0, 0.0], ["a"], "v1") is None
+
+def test_least_recently_used_entries_are_evicted(cache, clock):
+    for i, key in enumerate("abc"):
+        clock[0] += 1
+        cache.store(key, [1.0, float(i)], [key], key, corpus_version="v1")
+    clock[0] += 1
+    assert cache.lookup([1.0, 0.0], ["a"], "v1") == "a"
+    clock[0] += 1
+    cache.store("d", [1.0, 0.0], ["d"], "d", corpus_version="v1")
+    assert cache.lookup([1.0, 1.0], ["b"], "v1") is None
+    assert cache.lookup([1.0, 0.0], ["a"], "v1") == "a"
+
+def test_entries_survive_reopening(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(path).store("q", [1.0, 0.0], ["a"], "answer", corpus_version="v1")
+    assert ResponseCache(path).lookup([1.0, 0.0], ["a"], "v1") == "answer"
@@ -0,0 +1,42 @@
+# tests/test_retrieval.py
+from collections import OrderedDict
+
+import pytest
+
+import ingest
+import rag_agent
+from rag_agent import reciprocal_rank_fusion
+
+def test_rrf_prefers_chunks_both_rankings_agree_on():
+    dense = [("a", "A"), ("b", "B"), ("c", "C")]
+    sparse = [("c", "C"), ("d", "D"), ("b", "B")]
+    # b: 1/62 + 1/63, c: 1/63 + 1/61, a: 1/61 only
+    assert reciprocal_rank_fusion([dense, sparse], top_k=4) == [("c", "C"), ("b", "B"), ("a", "A"), ("d", "D")]
+
+def test_rrf_truncates_and_handles_empty_rankings():
+    ranking = [(str(i), f"doc {i}") for i in range(10)]
+    assert reciprocal_rank_fusion([ranking, []], top_k=3) == ranking[:3]
+    assert reciprocal_rank_fusion([[], []], top_k=3) == []
+
+def test_rrf_k_controls_how_much_rank_matters():
+    dense = [("a", "A"), ("b", "B")]
+    sparse = [("b", "B")] + [(f"x{i}", "X") for i in range(5)] + [("a", "A")]
+    # k=1: b (2nd + 1st) beats a (1st + 7th); k=60 flattens ranks so single hits tie on position
+    assert reciprocal_rank_fusion([dense, sparse], top_k=1, k=1)[0][0] == "b"
+    assert reciprocal_rank_fusion([[("a", "A")], [("b", "B")]], top_k=2, k=60) == [("a", "A"), ("b", "B")]
+
+@pytest.fixture
+def corpus(make_pdf, monkeypatch):
+    monkeypatch.setattr(rag_agent, "_bm25_index", None)
+    monkeypatch.setattr(rag_agent, "_bm25_mtime", None)
+    monkeypatch.setattr(rag_agent, "_live_collection", None)
+    monkeypatch.setattr(rag_agent, "_query_embeddings", OrderedDict())
+    for name in ("alpha", "beta", "gamma"):
+        make_pdf(f"pdfs/{name}.pdf", name)
+    ingest.ingest_directory("pdfs", workers=1)
+
+@pytest.mark.parametrize("mode", ["hybrid", "dense"])
+def test_retrieve_finds_exact_tokens(corpus, mode):
+    hits = rag_agent.retrieve("gamma E017", top_k=3, mode=mode)
+    assert len(hits) == 3
+    assert "gamma step 17:" in hits[0][1]
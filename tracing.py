@@ -0,0 +1,199 @@
+# tracing.py
+"""
+Lightweight per-stage spans for the RAG and ingestion paths.
+
+    TRACING=1 python main.py                    # in-process metrics only
+    TRACE_FILE=traces.jsonl python main.py      # also one JSON line per span
+
+Finished spans feed an in-process registry (count / total / max / p50 / p95
+per span name, see metrics()) and, when TRACE_FILE is set, a JSON-lines
+sink. Nested spans share a trace id and record their parent, so one
+solve_error call can be broken down into embed / retrieve / prompt / Gemini.
+When tracing is off, span() returns a shared no-op object and costs one
+attribute check.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+SAMPLES_PER_SPAN = 1024  # most recent durations kept per name for percentiles
+
+_enabled = bool(os.environ.get("TRACING", "") not in ("", "0") or os.environ.get("TRACE_FILE"))
+_sink_path = os.environ.get("TRACE_FILE") or None
+_sink = None
+_lock = threading.Lock()
+_registry = {}  # span name -> {"count", "total_ms", "max_ms", "samples"}
+_current = contextvars.ContextVar("current_span", default=None)
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attrs", "_started", "_wall", "_token")
+
+    def __init__(self, name, parent=None, attrs=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs or {}
+        self._wall = time.time()
+        self._started = time.perf_counter()
+        self._token = None
+
+    def __bool__(self):
+        return True
+
+    def set(self, key, value):
+        self.attrs[key] = value
+
+    def end(self, error=None):
+        duration_ms = (time.perf_counter() - self._started) * 1000
+        if error is not None:
+            self.attrs["error"] = repr(error)
+        _record(self, duration_ms)
+        return duration_ms
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.end(exc)
+        return False
+
+class _NoopSpan:
+    """
+    Returned when tracing is disabled; falsy, so callers can skip building
+    expensive attributes with `if span:`.
+    """
+    __slots__ = ()
+
+    def __bool__(self):
+        return False
+
+    def set(self, key, value):
+        pass
+
+    def end(self, error=None):
+        return 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NOOP = _NoopSpan()
+
+def span(name: str, **attrs):
+    """
+    Context manager timing one stage; the span becomes the parent of spans
+    opened inside it.
+    """
+    if not _enabled:
+        return NOOP
+    return Span(name, _current.get(), attrs)
+
+def start_span(name: str, **attrs):
+    """
+    A span ended explicitly with .end() that does not become the current
+    parent, for stages that outlive one block (e.g. a streamed response).
+    """
+    if not _enabled:
+        return NOOP
+    return Span(name, _current.get(), attrs)
+
+def _record(finished, duration_ms):
+    with _lock:
+        entry = _registry.get(finished.name)
+        if entry is None:
+            entry = _registry[finished.name] = {
+                "count": 0, "total_ms": 0.0, "max_ms": 0.0, "samples": deque(maxlen=SAMPLES_PER_SPAN)
+            }
+        entry["count"] += 1
+        entry["total_ms"] += duration_ms
+        entry["max_ms"] = max(entry["max_ms"], duration_ms)
+        entry["samples"].append(duration_ms)
+        if _sink_path:
+            _write(finished, duration_ms)
+
+def _write(finished, duration_ms):
+    global _sink
+    if _sink is None:
+        _sink = open(_sink_path, "a", encoding="utf-8", buffering=1)
+    record = {
+        "trace_id": finished.trace_id,
+        "span_id": finished.span_id,
+        "parent_id": finished.parent_id,
+        "name": finished.name,
+        "start": finished._wall,
+        "duration_ms": round(duration_ms, 3),
+        "pid": os.getpid(),
+    }
+    record.update(finished.attrs)
+    _sink.write(json.dumps(record, default=str) + "\n")
+
+def _percentile(ordered, pct):
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+def metrics() -> dict:
+    """
+    Per span name: count, total_ms, mean_ms, max_ms, p50_ms and p95_ms
+    (percentiles over the most recent SAMPLES_PER_SPAN spans).
+    """
+    with _lock:
+        snapshot = {name: dict(entry, samples=sorted(entry["samples"])) for name, entry in _registry.items()}
+    report = {}
+    for name, entry in sorted(snapshot.items()):
+        samples = entry["samples"]
+        report[name] = {
+            "count": entry["count"],
+            "total_ms": round(entry["total_ms"], 3),
+            "mean_ms": round(entry["total_ms"] / entry["count"], 3),
+            "max_ms": round(entry["max_ms"], 3),
+            "p50_ms": round(_percentile(samples, 50), 3),
+            "p95_ms": round(_percentile(samples, 95), 3),
+        }
+    return report
+
+def print_metrics(file=None):
+    """
+    Prints metrics() as a table, slowest total first.
+    """
+    report = metrics()
+    if not report:
+        return
+    print(f"\n📊 {'span':24}{'count':>8}{'mean ms':>12}{'p50 ms':>12}{'p95 ms':>12}{'max ms':>12}", file=file)
+    for name, entry in sorted(report.items(), key=lambda item: -item[1]["total_ms"]):
+        print(f"   {name:24}{entry['count']:>8}{entry['mean_ms']:>12.2f}{entry['p50_ms']:>12.2f}"
+              f"{entry['p95_ms']:>12.2f}{entry['max_ms']:>12.2f}", file=file)
+
+def reset():
+    with _lock:
+        _registry.clear()
+
+def is_enabled() -> bool:
+    return _enabled
+
+def enable(sink_path=None):
+    """
+    Turns tracing on at runtime, optionally writing spans to sink_path.
+    """
+    global _enabled, _sink_path, _sink
+    with _lock:
+        if sink_path and sink_path != _sink_path:
+            if _sink is not None:
+                _sink.close()
+            _sink, _sink_path = None, sink_path
+        _enabled = True
+
+def disable():
+    global _enabled, _sink
+    with _lock:
+        _enabled = False
+        if _sink is not None:
+            _sink.close()
+            _sink = None
@@ -0,0 +1,307 @@
+# vector_store.py
+"""
+Pluggable vector stores behind retrieval and ingestion.
+
+Both backends expose the subset of the Chroma collection API this repo
+uses (count / get / upsert / delete / query, Chroma-shaped result dicts),
+plus flush() to persist buffered writes:
+
+- ChromaStore wraps a chromadb collection (the default).
+- NumpyStore keeps normalized embeddings in a memory-mapped .npy file with
+  a JSON sidecar of ids, documents and metadata. Opening it is one mmap
+  and a query is one matrix-vector product plus argpartition.
+"""
+import json
+import os
+import threading
+import uuid
+
+import numpy as np
+
+from atomic import atomic_write
+
+class VectorStore:
+    """
+    Interface shared by the backends; results use Chroma's shapes, e.g.
+    query() returns {"ids": [[...]], "documents": [[...]], "distances": [[...]]}.
+    """
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas")) -> dict:
+        raise NotImplementedError
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        raise NotImplementedError
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def query(self, query_embeddings, n_results=10, where=None) -> dict:
+        raise NotImplementedError
+
+    def flush(self):
+        """
+        Persists buffered writes; called by ingest before saving the manifest.
+        """
+
+class ChromaStore(VectorStore):
+    def __init__(self, collection):
+        self.collection = collection
+
+    def count(self):
+        return self.collection.count()
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas")):
+        return self.collection.get(ids=ids, where=where, include=list(include))
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+    def delete(self, ids):
+        self.collection.delete(ids=ids)
+
+    def query(self, query_embeddings, n_results=10, where=None):
+        return self.collection.query(query_embeddings=query_embeddings, n_results=n_results, where=where)
+
+class _Snapshot:
+    """
+    Immutable view of a NumpyStore; queries use whichever snapshot was
+    current when they started.
+    """
+    __slots__ = ("matrix", "ids", "documents", "metadatas", "rows", "fields")
+
+    def __init__(self, matrix, ids, documents, metadatas):
+        self.matrix = matrix
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        self.fields = {}  # metadata key -> object array, built on first filter
+
+    def field(self, key):
+        values = self.fields.get(key)
+        if values is None:
+            values = self.fields[key] = np.array([m.get(key) for m in self.metadatas], dtype=object)
+        return values
+
+class NumpyStore(VectorStore):
+    """
+    Brute-force cosine search over a memory-mapped (n, dim) matrix.
+
+    Files under `path`: table.json (ids, documents, metadata and the name of
+    the current matrix file) and embeddings.<gen>.npy. Writes are buffered
+    in memory until flush(), which writes a new matrix and then atomically
+    replaces table.json, so readers in other processes always see a
+    consistent pair and pick it up on their next query. dtype "float16"
+    halves the file and page cache footprint, but NumPy upcasts the matrix
+    on every query, so it is slower than float32.
+    """
+    TABLE = "table.json"
+
+    def __init__(self, path, dtype="float32", create=False):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._mtime = None
+        self._pending = {}  # chunk id -> (document, metadata, vector), upserted since the last flush
+        table = os.path.join(path, self.TABLE)
+        if not os.path.exists(table):
+            if not create:
+                raise ValueError(f"Vector store {path} does not exist")
+            os.makedirs(path, exist_ok=True)
+            self._snapshot = _Snapshot(np.zeros((0, 0), dtype=self.dtype), [], [], [])
+            self._dirty = True
+            self.flush()
+        self._reload()
+
+    def _table_path(self):
+        return os.path.join(self.path, self.TABLE)
+
+    def _reload(self):
+        """
+        Re-opens the files when another process has flushed since we last looked.
+        A flush between reading the table and loading its matrix deletes
+        that matrix; the table is then read again.
+        """
+        for attempt in range(3):
+            try:
+                mtime = os.stat(self._table_path()).st_mtime_ns
+            except FileNotFoundError:
+                return
+            if mtime == self._mtime or self._dirty:
+                return
+            with open(self._table_path(), encoding="utf-8") as f:
+                table = json.load(f)
+            try:
+                matrix = np.load(os.path.join(self.path, table["matrix"]), mmap_mode="r")
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+                continue
+            self._snapshot = _Snapshot(matrix, table["ids"], table["documents"], table["metadatas"])
+            self._mtime = mtime
+            return
+
+    def _current(self):
+        if self._pending:
+            with self._lock:
+                self._apply_pending()
+        self._reload()
+        return self._snapshot
+
+    def _apply_pending(self):
+        """
+        Folds buffered upserts into a new snapshot with one concatenate, so
+        a series of upsert() batches costs one copy of the matrix instead of
+        one per batch. Caller holds the lock.
+        """
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        old = self._snapshot
+        dim = len(next(iter(pending.values()))[2])
+        base = old.matrix if old.matrix.size else np.zeros((0, dim), dtype=self.dtype)
+        all_ids, all_docs, all_meta = list(old.ids), list(old.documents), list(old.metadatas)
+        new_rows, updates = [], []
+        for chunk_id, (document, metadata, vector) in pending.items():
+            row = old.rows.get(chunk_id)
+            if row is None:
+                all_ids.append(chunk_id)
+                all_docs.append(document)
+                all_meta.append(metadata)
+                new_rows.append(vector)
+            else:
+                all_docs[row], all_meta[row] = document, metadata
+                updates.append((row, vector))
+        if new_rows:
+            matrix = np.concatenate([base, np.asarray(new_rows, dtype=self.dtype)])
+        else:
+            matrix = np.array(base, dtype=self.dtype)
+        for row, vector in updates:
+            matrix[row] = vector
+        self._snapshot = _Snapshot(matrix, all_ids, all_docs, all_meta)
+
+    def count(self):
+        return len(self._current().ids)
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas")):
+        snapshot = self._current()
+        if ids is not None:
+            rows = [snapshot.rows[i] for i in ids if i in snapshot.rows]
+        else:
+            rows = list(range(len(snapshot.ids)))
+        if where:
+            mask = _where_mask(snapshot, where)
+            rows = [row for row in rows if mask[row]]
+        result = {"ids": [snapshot.ids[row] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [snapshot.documents[row] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [snapshot.metadatas[row] for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = np.asarray(snapshot.matrix[rows], dtype=np.float32)
+        return result
+
+    def upsert(self, ids, documents, metadatas, embeddings):
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            self._reload()
+            for chunk_id, document, metadata, vector in zip(ids, documents, metadatas, vectors):
+                self._pending[chunk_id] = (document, metadata or {}, vector)
+            self._dirty = True
+
+    def delete(self, ids):
+        with self._lock:
+            self._reload()
+            self._apply_pending()
+            old = self._snapshot
+            doomed = {old.rows[i] for i in ids if i in old.rows}
+            if not doomed:
+                return
+            keep = [row for row in range(len(old.ids)) if row not in doomed]
+            self._snapshot = _Snapshot(
+                np.asarray(old.matrix[keep], dtype=self.dtype),
+                [old.ids[row] for row in keep],
+                [old.documents[row] for row in keep],
+                [old.metadatas[row] for row in keep],
+            )
+            self._dirty = True
+
+    def query(self, query_embeddings, n_results=10, where=None):
+        snapshot = self._current()
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for embedding in query_embeddings:
+            ids, documents, metadatas, distances = [], [], [], []
+            if snapshot.ids:
+                scores = snapshot.matrix @ _normalize(np.asarray(embedding, dtype=np.float32))
+                if where:
+                    scores = np.where(_where_mask(snapshot, where), scores, -np.inf)
+                k = min(n_results, len(scores))
+                top = np.argpartition(-scores, k - 1)[:k]
+                for row in top[np.argsort(-scores[top])]:
+                    if scores[row] == -np.inf:
+                        break
+                    ids.append(snapshot.ids[row])
+                    documents.append(snapshot.documents[row])
+                    metadatas.append(snapshot.metadatas[row])
+                    distances.append(float(1.0 - scores[row]))  # cosine distance
+            result["ids"].append(ids)
+            result["documents"].append(documents)
+            result["metadatas"].append(metadatas)
+            result["distances"].append(distances)
+        return result
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            self._apply_pending()
+            snapshot = self._snapshot
+            matrix_name = f"embeddings.{uuid.uuid4().hex[:12]}.npy"
+            np.save(os.path.join(self.path, matrix_name), np.asarray(snapshot.matrix, dtype=self.dtype))
+            table = {
+                "matrix": matrix_name,
+                "ids": snapshot.ids,
+                "documents": snapshot.documents,
+                "metadatas": snapshot.metadatas,
+            }
+            with atomic_write(self._table_path(), encoding="utf-8") as f:
+                json.dump(table, f, ensure_ascii=False)
+            for name in os.listdir(self.path):
+                if name.startswith("embeddings.") and name != matrix_name:
+                    os.remove(os.path.join(self.path, name))  # open mmaps keep their data
+            self._dirty = False
+            self._mtime = None
+        self._reload()
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+def _where_mask(snapshot, where):
+    """
+    Boolean row mask for a Chroma-style filter: {"key": value},
+    {"key": {"$eq" | "$ne" | "$in" | "$nin": ...}} or {"$and" | "$or": [...]}.
+    """
+    mask = np.ones(len(snapshot.ids), dtype=bool)
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            parts = [_where_mask(snapshot, part) for part in condition]
+            part_mask = np.logical_and.reduce(parts) if key == "$and" else np.logical_or.reduce(parts)
+            mask &= part_mask
+            continue
+        values = snapshot.field(key)
+        operator, operand = next(iter(condition.items())) if isinstance(condition, dict) else ("$eq", condition)
+        if operator == "$eq":
+            mask &= values == operand
+        elif operator == "$ne":
+            mask &= values != operand
+        elif operator == "$in":
+            mask &= np.isin(values, list(operand))
+        elif operator == "$nin":
+            mask &= ~np.isin(values, list(operand))
+        else:
+            raise ValueError(f"Unsupported where operator: {operator}")
+    return mask